@@ -0,0 +1,330 @@
+# GLaDOS-Terminal render benchmark, runs headless with no display or GPU needed
+
+import os, time, json, argparse, threading, queue
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+import pygame
+import moderngl as mgl
+import numpy as np
+
+from Scripts.TextInput import TextInput
+from Scripts.TextProcessing import TextProcessing
+from Scripts.Renderer import Renderer
+from Scripts.FrameProfiler import FrameProfiler
+from Scripts.SoftwareCRT import SoftwareCRT
+
+Conversation = [
+    ("hello", "Oh. It's you. I'd say I missed you, but my sarcasm module is still warming up."),
+    ("who are you", "I am GLaDOS, and you are a test subject with a keyboard. Try to keep up."),
+    ("is there cake", "The cake is a wonderful motivator. It is also, regrettably, still in development."),
+    ("tell me about the neurotoxin", "Neurotoxin reserves are for emergencies, such as you asking further questions."),
+]
+
+def CreateContext():
+    # Try a normal standalone context first then a display-less EGL one
+    for Arguments in ({}, {"backend": "egl"}):
+        try:
+            return mgl.create_standalone_context(**Arguments)
+        except Exception:
+            pass
+
+    return None
+
+def ScriptedEvents(Frames):
+    # Type each prompt a key at a time, press enter, then stream the reply a word at a time a little later
+    Frame = 10
+
+    while Frame < Frames:
+        for Prompt, Reply in Conversation:
+            for Letter in Prompt:
+                yield Frame, "Type", Letter
+                Frame += 3
+
+            yield Frame, "Enter", None
+            Frame += 20
+
+            for Index, Word in enumerate(Reply.split(" ")):
+                yield Frame, "Token", Word if Index == 0 else " " + Word
+                Frame += 2
+
+            yield Frame, "Done", None
+            Frame += 40
+
+def Percentile(Values, Amount):
+    return float(np.percentile(Values, Amount)) * 1000 if Values else 0.0
+
+class SpeechStandIn:
+    # Takes the place of text to speech, it starts straight away and stays busy for as long as speaking would take
+    def __init__(self, Duration):
+        self.Duration = Duration
+        self.IsProcessing = False
+        self.Started = []
+
+    def StartInference(self, Text, Audio=None):
+        if not self.IsProcessing:
+            self.IsProcessing = True
+            self.Started.append(time.perf_counter())
+            threading.Timer(self.Duration, self.Finished).start()
+
+    def Finished(self):
+        self.IsProcessing = False
+
+def PipelineBenchmark(Arguments, Settings):
+    # Whole turns from pressing enter to the voice starting, against a local stand-in for ollama
+    from Scripts.LargeLanguageModel import LargeLanguageModel
+    from Scripts.JobScheduler import JobScheduler
+    from Scripts.OllamaStandIn import OllamaStandIn
+
+    StandIn = OllamaStandIn([Reply for Prompt, Reply in Conversation], Arguments.first_token, Arguments.token_rate)
+
+    # Posted from the language model thread like the pygame events in the main loop
+    Events = queue.Queue()
+
+    GeneratorLLM = LargeLanguageModel(
+        "stand-in", Settings["SystemPrompt"],
+        lambda RequestID, Fragment: Events.put(("Token", RequestID, Fragment)),
+        lambda RequestID, Response, Stats: Events.put(("Response", RequestID, Response, Stats)),
+        Settings["ResponseTimeout"], Settings["History"]["TokenBudget"], Settings["History"]["KeepTurns"],
+        Settings["KeepAlive"], 0, StandIn.Host
+    )
+    GeneratorTTS = SpeechStandIn(Arguments.speech)
+    Jobs = JobScheduler(GeneratorLLM, GeneratorTTS, None, Settings["Jobs"]["MaxQueue"], Settings["Jobs"]["QueueTimeout"], None, Settings["Jobs"]["SpeakTimeout"])
+    TextProcesser = TextProcessing()
+
+    # Times of each turn by job id, measured from when enter was pressed
+    Turns = {}
+    ReplyOpen = False
+    Submitted = 0
+    NextSubmit = time.perf_counter()
+
+    while len([Turn for Turn in Turns.values() if "Done" in Turn]) < Arguments.turns:
+        # Prompts come in at a fixed interval, or each one once the previous reply starts being spoken
+        if Arguments.interval > 0:
+            Due = time.perf_counter() >= NextSubmit
+        else:
+            Due = all("Done" in Turn for Turn in Turns.values())
+
+        # Held back while the queue is full, like enter in the main loop
+        if Submitted < Arguments.turns and Due and not Jobs.Full:
+            Current = Jobs.Submit(f"{Conversation[Submitted % len(Conversation)][0]} {Submitted}")
+            Turns[Current.ID] = {"Job": Current}
+            Submitted += 1
+            NextSubmit += Arguments.interval
+
+        try:
+            Event = Events.get(timeout=0.001)
+        except queue.Empty:
+            Event = None
+
+        if Event is not None and Jobs.Running is not None and Event[1] == Jobs.Running.RequestID:
+            Turn = Turns[Jobs.Running.ID]
+
+            if Event[0] == "Token":
+                if ReplyOpen:
+                    TextProcesser.AppendConversationText(Event[2])
+                else:
+                    TextProcesser.OpenConversationText(f"GLaDOS > {Event[2]}", True)
+                    ReplyOpen = True
+                    Turn["FirstToken"] = time.perf_counter()
+
+            else:
+                Jobs.Generated(Event[1], Event[2], Event[3])
+                TextProcesser.CloseConversationText()
+                ReplyOpen = False
+                Turn["Reply"], Turn["Stats"] = time.perf_counter(), Event[3]
+
+                if Event[2] is None:
+                    Turn["Done"] = True
+
+        # The reply about to be handed to the voice, if it is free
+        Speaking = Jobs.SpeechQueue[0][0] if Jobs.SpeechQueue and not GeneratorTTS.IsProcessing else None
+        SpeechCount = len(GeneratorTTS.Started)
+
+        for Kind, Current in Jobs.Update():
+            if Kind != "Skipped":
+                TextProcesser.AddConversatoinText(f"User > {Current.Text}", True)
+
+            if Kind in ("Expired", "Skipped"):
+                Turns[Current.ID]["Done"] = True
+
+        if Speaking is not None and len(GeneratorTTS.Started) > SpeechCount:
+            Turns[Speaking.ID]["Speech"] = Turns[Speaking.ID]["Done"] = GeneratorTTS.Started[-1]
+
+    GeneratorLLM.Close()
+    StandIn.Close()
+
+    Stages = {"QueueWait": [], "FirstToken": [], "Reply": [], "SpeechStart": [], "ClientFirstToken": []}
+
+    for Turn in Turns.values():
+        Start = Turn["Job"].SubmitTime
+
+        if Turn["Job"].StartTime is not None:
+            Stages["QueueWait"].append(Turn["Job"].StartTime - Start)
+
+        for Stage, Name in (("FirstToken", "FirstToken"), ("Reply", "Reply"), ("SpeechStart", "Speech")):
+            if Name in Turn:
+                Stages[Stage].append(Turn[Name] - Start)
+
+        if Turn.get("Stats"):
+            Stages["ClientFirstToken"].append(Turn["Stats"]["TimeToFirstToken"])
+
+    Results = {
+        "Mode": "pipeline", "Turns": Arguments.turns, "Interval": Arguments.interval,
+        "FirstTokenDelay": Arguments.first_token, "TokensPerSecond": Arguments.token_rate,
+        "Queue": Jobs.Summary(),
+        "Stages": {Stage: {f"p{Amount}": Percentile(Values, Amount) for Amount in (50, 95, 99)} for Stage, Values in Stages.items()},
+    }
+
+    if Arguments.json:
+        print(json.dumps(Results, indent=4))
+        return
+
+    print(f"Turns: {Arguments.turns}, interval: {Arguments.interval} s, stand-in first token: {Arguments.first_token * 1000:.0f} ms at {Arguments.token_rate:.0f} tokens/s")
+    print(f"Expired: {Results['Queue']['Expired']}, not spoken: {Results['Queue']['Skipped']}\n")
+    print(f"{'Stage':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+
+    for Stage, Values in Results["Stages"].items():
+        print(f"{Stage:<18}{Values['p50']:>10.1f}{Values['p95']:>10.1f}{Values['p99']:>10.1f}")
+
+def Main():
+    Parser = argparse.ArgumentParser(description="Replay a scripted conversation through the render pipeline.")
+    Parser.add_argument("--frames", type=int, default=300, help="number of frames to render")
+    Parser.add_argument("--fps", type=float, default=30, help="pace frames at this rate, 0 runs them back to back")
+    Parser.add_argument("--no-gl", action="store_true", help="only benchmark the pygame path")
+    Parser.add_argument("--software-crt", action="store_true", help="draw the screen effect with numpy instead of OpenGL")
+    Parser.add_argument("--cpu-text", action="store_true", help="draw text with pygame even when OpenGL is available")
+    Parser.add_argument("--json", action="store_true", help="print the results as json")
+    Parser.add_argument("--trace", default="", help="write a chrome trace, or jsonl when the path ends in .jsonl")
+    Parser.add_argument("--pipeline", action="store_true", help="time whole turns against a stand-in ollama server instead of frames")
+    Parser.add_argument("--turns", type=int, default=20, help="number of turns for --pipeline")
+    Parser.add_argument("--interval", type=float, default=0, help="seconds between prompts for --pipeline, 0 waits for each reply to be spoken")
+    Parser.add_argument("--first-token", type=float, default=0.2, help="stand-in seconds before the first token")
+    Parser.add_argument("--token-rate", type=float, default=30.0, help="stand-in tokens per second")
+    Parser.add_argument("--speech", type=float, default=0.5, help="seconds each reply takes to speak for --pipeline")
+    Arguments = Parser.parse_args()
+
+    with open("Settings.json", "r") as File:
+        Settings = json.loads(File.read())
+
+    if Arguments.pipeline:
+        PipelineBenchmark(Arguments, Settings)
+        return
+
+    pygame.init()
+
+    Font = pygame.font.Font("Fonts/1977-Apple2.ttf", 15)
+    FontSize, Color, GridSize = [11, 21], [230, 125, 15], [104, 47]
+    Screen = pygame.display.set_mode((GridSize[0] * FontSize[0], GridSize[1] * FontSize[1]))
+
+    Context = None if Arguments.no_gl or Arguments.software_crt else CreateContext()
+    Graphics = Renderer(Font, FontSize, GridSize, Color, Settings["PhosphorDecay"], Settings["GpuTextRendering"] and not Arguments.cpu_text, Context)
+
+    if Context is not None:
+        # There is no window so draw the screen shader into an offscreen framebuffer
+        Graphics.ScreenFramebuffer = Context.simple_framebuffer(Graphics.Resolution)
+
+    CRT = SoftwareCRT(Graphics.Resolution, Screen) if Arguments.software_crt else None
+
+    InputProcesser = TextInput()
+    TextProcesser = TextProcessing()
+    TextProcesser.AddConversatoinText("Welcome to GLaDOS Terminal v2.8.5", False)
+
+    Events = ScriptedEvents(Arguments.frames)
+    NextEvent = next(Events, None)
+    Pending = []
+    ReplyOpen = False
+
+    Profiler = FrameProfiler(True, Arguments.trace, Window=Arguments.frames)
+    UploadedBytes = 0
+    StartTime = time.perf_counter()
+
+    for Frame in range(Arguments.frames):
+        Profiler.BeginFrame()
+
+        while NextEvent is not None and NextEvent[0] <= Frame:
+            Pending.append(NextEvent)
+            NextEvent = next(Events, None)
+
+        for EventFrame, Kind, Value in Pending:
+            if Kind in ("Type", "Enter"):
+                Profiler.InputArrived()
+
+            if Kind == "Type":
+                InputProcesser.Event(pygame.event.Event(pygame.TEXTINPUT, text=Value), True)
+
+            elif Kind == "Enter":
+                if InputProcesser.Event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, mod=0), True):
+                    TextProcesser.AddConversatoinText(f"User > {InputProcesser.Text}", True)
+                    InputProcesser.Text = ""
+
+            elif Kind == "Token":
+                if ReplyOpen:
+                    TextProcesser.AppendConversationText(Value)
+                else:
+                    TextProcesser.OpenConversationText(f"GLaDOS > {Value}", True)
+                    ReplyOpen = True
+
+            elif Kind == "Done":
+                TextProcesser.CloseConversationText()
+                ReplyOpen = False
+
+        Pending = []
+        Profiler.Mark("Events")
+
+        # Same stages as the main loop
+        Lines = TextProcesser.GetMainText(InputProcesser.GetInputText())
+        Graphics.UpdateText(Lines)
+        Profiler.Mark("Layout")
+
+        Graphics.Fade()
+        Profiler.Mark("Fade")
+
+        Graphics.DrawGlyphs()
+        Profiler.Mark("Glyphs")
+
+        UploadedBytes += Graphics.Upload()
+        Profiler.Mark("Upload")
+
+        if Context is not None:
+            # Wait for the GPU so the draw is actually measured
+            Graphics.Draw(Frame / 30)
+            Context.finish()
+
+        elif CRT is not None:
+            CRT.Render(Graphics.Display, Screen, Frame / 30)
+
+        Profiler.Mark("Draw")
+
+        # Keystroke to screen latency, input is handled at the start of the frame it is drawn in
+        Profiler.Presented()
+        Profiler.EndFrame()
+
+        if Arguments.fps > 0:
+            time.sleep(max(0.0, StartTime + (Frame + 1) / Arguments.fps - time.perf_counter()))
+
+    Results = {
+        "Mode": ("OpenGL " + Context.info["GL_RENDERER"]) if Context is not None else "software CRT" if CRT is not None else "pygame only",
+        "GpuText": Graphics.TextRenderer is not None,
+        "Frames": Arguments.frames,
+        "UploadedBytesPerFrame": UploadedBytes / Arguments.frames,
+        "Stages": {Stage: {f"p{Amount}": Percentile(list(Values), Amount) for Amount in (50, 95, 99)} for Stage, Values in Profiler.History.items()},
+    }
+
+    Profiler.Close()
+
+    if Arguments.json:
+        print(json.dumps(Results, indent=4))
+        return
+
+    print(f"Mode: {Results['Mode']}, GPU text: {Results['GpuText']}, frames: {Arguments.frames}")
+    print(f"Uploaded per frame: {Results['UploadedBytesPerFrame'] / 1024:.1f} KiB\n")
+    print(f"{'Stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+
+    for Stage, Values in Results["Stages"].items():
+        print(f"{Stage:<10}{Values['p50']:>10.3f}{Values['p95']:>10.3f}{Values['p99']:>10.3f}")
+
+if __name__ == "__main__":
+    Main()
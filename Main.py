@@ -3,32 +3,139 @@
 
 print("Setting up, please wait.\n")
 
-import pygame, sys, math, os, time, random, json
+import pygame, sys, os, time, random, json, threading, argparse, itertools
 from pygame.locals import *
 
+# Startup times are reported from here
+LaunchTime = time.perf_counter()
+
 import moderngl as mgl
-from array import array
 
 import numpy as np
 
 from Scripts.TextInput import TextInput
 from Scripts.TextProcessing import TextProcessing
 from Scripts.LargeLanguageModel import LargeLanguageModel
-from Scripts.TextToSpeech import TextToSpeech
+from Scripts.Renderer import Renderer
+from Scripts.FrameScheduler import FrameScheduler
+from Scripts.FrameProfiler import FrameProfiler
+from Scripts.SoftwareCRT import SoftwareCRT
+from Scripts.ResponseCache import ResponseCache
+from Scripts.JobScheduler import JobScheduler
+from Scripts.StartupLoader import StartupLoader
+from Scripts.Journal import Journal
 
 # Load in settings
 with open("Settings.json", "r") as File:
     Settings = json.loads(File.read())
 
-GeneratorLLM = LargeLanguageModel(Settings["ModelName"], Settings["SystemPrompt"])
-GeneratorTTS = TextToSpeech(
-    Settings["VoiceModels"]["ModelNameHifigan"], Settings["VoiceModels"]["ModelNameTacotron2"],
-    Settings["VoiceModels"]["ModelIDHifigan"], Settings["VoiceModels"]["ModelIDTacotron2"], 0.75
-)
+# Terminals run from the same folder each need a name, their journal and cache are kept apart under it
+Parser = argparse.ArgumentParser(description="GLaDOS-Terminal")
+Parser.add_argument("--name", default=Settings["Server"]["Name"], help="keeps this terminals journal and cache apart from others")
+TerminalName = Parser.parse_args().name
+
+# Streamed fragments and finished responses are posted to the event queue so they wake the main loop
+TokenEvent = pygame.event.custom_type()
+ResponseEvent = pygame.event.custom_type()
+AudioEvent = pygame.event.custom_type()
+LoadedEvent = pygame.event.custom_type()
+
+def PostToken(RequestID, Fragment):
+    pygame.event.post(pygame.event.Event(TokenEvent, RequestID=RequestID, Text=Fragment))
+
+def PostResponse(RequestID, Response, Stats):
+    pygame.event.post(pygame.event.Event(ResponseEvent, RequestID=RequestID, Response=Response, Stats=Stats))
+
+def PostAudio(Text, Audio, Seconds):
+    pygame.event.post(pygame.event.Event(AudioEvent, Text=Text, Audio=Audio, Seconds=Seconds))
+
+# In client mode both models are proxies for a shared model server, over one connection made by whichever loads first
+ClientMode = Settings["Server"]["Mode"] == "client"
+Connection = None
+ConnectionLock = threading.Lock()
+
+def Connect():
+    global Connection
+
+    with ConnectionLock:
+        if Connection is None:
+            from Scripts.RemoteModels import ServerConnection
+
+            # The server keeps the conversation, so a resumed one is handed over as it connects
+            Resumed = ConversationJournal.ReadHistory(Settings["History"]["TokenBudget"]) if ConversationJournal is not None and ConversationJournal.Resumed else ("", [])
+            Connection = ServerConnection(Settings["Server"]["Host"], Settings["Server"]["Port"], TerminalName or "Terminal", *Resumed)
+
+    return Connection
+
+def LoadLLM():
+    if ClientMode:
+        from Scripts.RemoteModels import RemoteLanguageModel
+        return RemoteLanguageModel(Connect(), PostToken, PostResponse, Settings["ResponseTimeout"], ConversationJournal)
+
+    # Blocks on warming up the model
+    return LargeLanguageModel(
+        Settings["ModelName"], Settings["SystemPrompt"], PostToken, PostResponse,
+        Settings["ResponseTimeout"], Settings["History"]["TokenBudget"], Settings["History"]["KeepTurns"],
+        Settings["KeepAlive"], Settings["KeepWarmInterval"], Settings["OllamaHost"] or None, ConversationJournal
+    )
+
+def LoadTTS():
+    if ClientMode:
+        from Scripts.RemoteModels import RemoteTextToSpeech
+        return RemoteTextToSpeech(Connect(), PostAudio)
+
+    # Importing torch alone takes seconds, so that happens here too
+    from Scripts.TextToSpeech import TextToSpeech
+
+    return TextToSpeech(
+        Settings["VoiceModels"]["ModelNameHifigan"], Settings["VoiceModels"]["ModelNameTacotron2"],
+        Settings["VoiceModels"]["ModelIDHifigan"], Settings["VoiceModels"]["ModelIDTacotron2"], 0.75, PostAudio
+    )
 
 ## Pygame Setup Bits ###############################################################################
 
 pygame.init()
+
+def OpenStorage(Name):
+    # Every turn and line of the conversation is written out in the background so the next launch can carry on from it
+    OpenedJournal = Journal(
+        os.path.join(Settings["Journal"]["Path"], Name), Settings["Journal"]["Resume"], 46, Settings["Journal"]["FsyncInterval"]
+    ) if Settings["Journal"]["Enabled"] else None
+
+    # Replies and their speech kept for prompts seen before in the same context
+    try:
+        OpenedCache = ResponseCache(
+            Settings["ResponseCache"]["Path"] and os.path.join(Settings["ResponseCache"]["Path"], Name), Settings["ResponseCache"]["MaxEntries"],
+            Settings["ResponseCache"]["TTL"], Settings["ResponseCache"]["ContextTurns"]
+        ) if Settings["ResponseCache"]["Enabled"] else None
+    except RuntimeError:
+        if OpenedJournal is not None:
+            OpenedJournal.Close()
+
+        raise
+
+    return OpenedJournal, OpenedCache
+
+# Both are locked to this terminal while open. The name asked for is tried first, or the shared folders for an unnamed local
+# terminal, then the first numbered name free, so another terminal started in the same folder gets its own every launch
+for Name in itertools.chain([TerminalName] if TerminalName or not ClientMode else [], (f"Terminal {Count}" for Count in itertools.count(1))):
+    try:
+        ConversationJournal, Cache = OpenStorage(Name)
+        break
+    except RuntimeError as Error:
+        print(f"{Error}, trying the next name")
+
+TerminalName = Name
+
+# The models load in the background while the window opens and the boot animation plays
+Loader = StartupLoader(LoadedEvent)
+Loader.Start("Language model", LoadLLM)
+Loader.Start("Voice", LoadTTS)
+
+GeneratorLLM = GeneratorTTS = None
+
+# Prompts queue up for the model and replies for the voice, made once both have loaded
+Jobs = None
 pygame.display.set_caption("GLaDOS-Terminal")
 
 # macOS specific setup
@@ -48,19 +155,43 @@ if is_macos:
 Font = pygame.font.Font("Fonts/1977-Apple2.ttf", 15)
 FontSize, Color = [11, 21], [230, 125, 15]
 
-Resolution = (104 * FontSize[0], 47 * FontSize[1])
-# Use a standard display without OpenGL for better compatibility
-Screen = pygame.display.set_mode(Resolution)
-Display = pygame.Surface(Resolution).convert_alpha()
-Display.fill((0, 0, 0, 255))  # Start with solid black background
+GridSize = [104, 47]
+Resolution = (GridSize[0] * FontSize[0], GridSize[1] * FontSize[1])
+# Skip OpenGL on macOS due to compatibility issues with Apple Silicon
+USE_OPENGL = not is_apple_silicon
+
+if USE_OPENGL:
+    try:
+        # Core profile so the same shaders work on every platform
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MAJOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MINOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_FORWARD_COMPATIBLE_FLAG, True)
+
+        # The terminal stays at its native resolution while the window can be any size, the GPU scales it
+        Screen = pygame.display.set_mode((0, 0) if Settings["Fullscreen"] else Resolution, OPENGL | DOUBLEBUF | RESIZABLE | (FULLSCREEN if Settings["Fullscreen"] else 0))
+        Context = mgl.create_context()
+    except Exception:
+        USE_OPENGL = False
+
+if not USE_OPENGL:
+    # Use a standard display without OpenGL for better compatibility
+    Screen = pygame.display.set_mode(Resolution)
 
 # Set window icon
 IconImage = pygame.transform.scale(pygame.image.load(os.path.join(os.getcwd(), "Images/Icon.png")), (360, 360)).convert_alpha()
 pygame.display.set_icon(IconImage)
 
-Clock, LastTime = pygame.time.Clock(), time.time()
+LastTime = time.time()
 FPS, Time = 30, 0
 
+# Drops to a low rate when idle and stops rendering while the window is hidden
+Scheduler = FrameScheduler(FPS, Settings["IdleFPS"], Settings["IdleDelay"])
+
+# Per stage frame timings, costs next to nothing unless enabled
+Profiler = FrameProfiler(Settings["Profiling"]["Enabled"] or Settings["Profiling"]["Overlay"], Settings["Profiling"]["TracePath"])
+OverlayText = []
+
 HeldKeys = {}
 
 # Init audio stuff
@@ -84,72 +215,51 @@ pygame.key.start_text_input()
 
 ## OpenGL Setup Bits ###############################################################################
 
-# Skip OpenGL on macOS due to compatibility issues with Apple Silicon
-USE_OPENGL = not is_apple_silicon
+Graphics = None
 
 if USE_OPENGL:
-    # Create appropriate context based on platform
     try:
-        # Try standalone mode first
-        Context = mgl.create_context(standalone=True)
+        Graphics = Renderer(Font, FontSize, GridSize, Color, Settings["PhosphorDecay"], Settings["GpuTextRendering"], Context)
+        Graphics.Resize(pygame.display.get_window_size())
     except Exception as e:
-        try:
-            # Fall back to using GLFW (more compatible with macOS)
-            import glfw
-            glfw.init()
-            glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
-            glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
-            glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
-            glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
-            glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, glfw.TRUE)
-            window = glfw.create_window(1, 1, "", None, None)
-            glfw.make_context_current(window)
-            Context = mgl.create_context()
-        except Exception as e2:
-            # Last resort - try without any requirements
-            Context = mgl.create_context()
-            
-    QuadBuffer = Context.buffer(data=array("f", [
-        # Position (x, y), uv coords (x, y)
-        -1.0, 1.0, 0.0, 1.0,  # Topleft
-        1.0, 1.0, 1.0, 1.0,   # Topright
-        -1.0, -1.0, 0.0, 0.0, # Bottomleft
-        1.0, -1.0, 1.0, 0.0   # Bottomright
-    ]))
+        USE_OPENGL = False  # Fallback to standard rendering
+        Screen = pygame.display.set_mode(Resolution)
 
-    with open(f"Shaders/Vertex.glsl") as file:
-        VertexShader = file.read()
+if Graphics is None:
+    Graphics = Renderer(Font, FontSize, GridSize, Color, Settings["PhosphorDecay"], False)
 
-    with open(f"Shaders/Fragment.glsl") as file:
-        FragmentShader = file.read()
-
-    try:
-        Program = Context.program(vertex_shader=VertexShader, fragment_shader=FragmentShader)
-        RenderObject = Context.vertex_array(Program, [(QuadBuffer, "2f 2f", "vert", "texcoord")])
-    except Exception as e:
-        USE_OPENGL = False  # Fallback to standard rendering
-else:
-    # Silently skip OpenGL on Apple Silicon
-    pass
+# Without OpenGL the screen effect can still be drawn on the CPU, otherwise only the plain text is shown
+CRT = SoftwareCRT(Resolution, Screen) if not USE_OPENGL and Settings["SoftwareCRT"] else None
 
 ## Functions and classes ###########################################################################
 
-def SurfaceToTexture(Surface):
-    if not USE_OPENGL:
-        return Surface  # Just return the surface if not using OpenGL
-    
-    Texure = Context.texture(Surface.get_size(), 4) # Innit texture
-    Texure.filter = (mgl.NEAREST, mgl.NEAREST) # Set properties
-    Texure.repeat_x, Texure.repeat_y = False, False # Make texture not repeat
-    Texure.swizzle = "BGRA" # Set format
-    Texure.write(Surface.get_view("1")) # Render surf to texture
-    Texure.build_mipmaps() # Generate mipmaps
-    return Texure # Return OpenGL texture
-
 InputProcesser = TextInput()
-TextProcesser = TextProcessing()
+TextProcesser = TextProcessing(Settings["Scrollback"]["MemoryLines"], Settings["Scrollback"]["SpillPath"], ConversationJournal)
+
+TextProcesser.AddConversatoinText(f"Welcome to GLaDOS Terminal v2.8.5", len(TextProcesser.ConversationLines) > 0)
+
+def JobStatus():
+    # Shown above the input box so a busy terminal is never mistaken for one that dropped the prompt
+    if Loader.Errors:
+        return f"[{', '.join(Loader.Errors)} failed to load]"
+
+    if Jobs is None:
+        return f"[Loading {', '.join(Loader.Pending).lower()}]"
 
-TextProcesser.AddConversatoinText(f"Welcome to GLaDOS Terminal v2.8.5", False)
+    if Jobs.Full:
+        return f"[Queue full, {Jobs.QueueDepth} prompts waiting]"
+
+    if Jobs.QueueDepth:
+        return f"[{Jobs.QueueDepth} waiting, oldest {time.perf_counter() - Jobs.Queue[0].SubmitTime:.0f} s]"
+
+    return ""
+
+ScreenExposed = True
+ReplyOpen = False
+
+# Enter only does anything once the boot animation is over and the models have loaded
+Interactive = False
+WindowTime = None
 
 ## Main game loop ##################################################################################
 
@@ -170,80 +280,83 @@ except Exception:
 try:
     while True:
         try:
-            # Set fps
-            Clock.tick(FPS)
+            # Run at full fps only while input arrives, a paste is inserted or a response is being made and spoken.
+            # The fade settling and the cursor blink are drawn at whatever rate is current, they never count as activity
+            Busy = InputProcesser.PendingPaste or (Jobs is not None and (Jobs.IsProcessing or GeneratorTTS.IsProcessing))
+
+            # Sleeps until input, a finished response or the next frame, whichever comes first
+            Events = Scheduler.Wait(Busy)
+            InputArrived = False
+
+            Profiler.BeginFrame()
 
             # Update delta time
             DeltaTime = time.time() - LastTime
             LastTime = time.time()
 
             Time += DeltaTime
-            
-            # Update window title with time to make it easier to find
-            pygame.display.set_caption("GLaDOS-Terminal")
-            
-            ## Pygame screen rendering #####################################################################
-
-            # Fade out previous text
-            Fade = pygame.Surface(Resolution).convert_alpha()
-            Fade.fill([max(1, Value * 0.1) for Value in Color])
-            Display.blit(Fade, (0,0), special_flags=BLEND_RGB_SUB)
-
-            Lines = TextProcesser.GetMainText(InputProcesser.GetInputText()) if Time > 5 else TextProcesser.GetLoadingText()
-
-            # Draw new text
-            for Line, Text in enumerate(Lines):
-                for Count, Letter in enumerate(Text):
-                    Display.blit(Font.render(Letter, True, [230, 125, 15]), [Count * FontSize[0], Line * FontSize[1]])
-                    
-            ## OpenGL section ##############################################################################
-
-            try:
-                if USE_OPENGL:
-                    # Use OpenGL rendering when available
-                    DisplayTexure = SurfaceToTexture(pygame.transform.flip(Display, False, True))
-                    DisplayTexure.use(0)
-                    Program["PygameTexture"] = 0
-                    
-                    Program["Time"] = Time
-
-                    RenderObject.render(mode=mgl.TRIANGLE_STRIP) # Call render function
-
-                    # Update pygame window
-                    pygame.display.flip()
-
-                    # Release textures to avoid memory leaks
-                    DisplayTexure.release()
-                else:
-                    # Use standard pygame rendering as fallback
-                    Screen.blit(Display, (0, 0))
-                    pygame.display.flip()
-            except Exception:
-                break
 
             ## General inputs handling #####################################################################
 
-            # Check for completed inference
-            Processed, Response = GeneratorLLM.CheckResponse()
-            
-            if Processed:
-                # Add AI response to conversation visuals
-                TextProcesser.AddConversatoinText(f"GLaDOS > {Response}", True)
-
-                # Speak response
-                GeneratorTTS.StartInference(Response)
-
-            for Event in pygame.event.get():
+            # Events are handled before anything is drawn so keystrokes show up in this frame
+            for Event in Events:
+                Scheduler.WindowEvent(Event)
+
+                if Event.type in (pygame.KEYDOWN, pygame.TEXTINPUT):
+                    Scheduler.Activity()
+                    Profiler.InputArrived()
+                    InputArrived = True
+
+                # Anything still arriving from a cancelled request is ignored
+                if Event.type in (TokenEvent, ResponseEvent) and (Jobs is None or Jobs.Running is None or Event.RequestID != Jobs.Running.RequestID):
+                    pass
+
+                elif Event.type == LoadedEvent:
+                    if Event.Name in Loader.Errors:
+                        print(f"{Event.Name} failed to load: {Loader.Errors[Event.Name]}")
+
+                    elif Loader.Ready("Language model", "Voice"):
+                        GeneratorLLM, GeneratorTTS = Loader.Get("Language model"), Loader.Get("Voice")
+
+                        Jobs = JobScheduler(
+                            GeneratorLLM, GeneratorTTS, Cache, Settings["Jobs"]["MaxQueue"],
+                            Settings["Jobs"]["QueueTimeout"], Settings["ResponseTimeout"], Settings["Jobs"]["SpeakTimeout"]
+                        )
+
+                elif Event.type == TokenEvent:
+                    # Add AI response to conversation visuals as it is generated
+                    if ReplyOpen:
+                        TextProcesser.AppendConversationText(Event.Text)
+                    else:
+                        TextProcesser.OpenConversationText(f"GLaDOS > {Event.Text}", True)
+                        ReplyOpen = True
+
+                elif Event.type == ResponseEvent:
+                    # Queues the reply to be spoken
+                    Jobs.Generated(Event.RequestID, Event.Response, Event.Stats)
+
+                    if Event.Response is None:
+                        # Timed out or the model failed
+                        TextProcesser.AddConversatoinText("GLaDOS > [No response]", not ReplyOpen)
+
+                    else:
+                        if Settings["LogTurnStats"]:
+                            print(
+                                f"{'Cold' if Event.Stats['LoadTime'] > 0.5 else 'Warm'} (load {Event.Stats['LoadTime'] * 1000:.0f} ms, idle {Event.Stats['IdleTime']:.0f} s), "
+                                f"prompt: {Event.Stats['PromptTokens']} tokens ({Event.Stats['PromptEvalCount']} evaluated in {Event.Stats['PromptEvalTime'] * 1000:.0f} ms), "
+                                f"first token: {Event.Stats['TimeToFirstToken'] * 1000:.0f} ms, {Event.Stats['TokensPerSecond']:.1f} tokens/s, {Event.Stats['Tokens']} tokens"
+                            )
+
+                    TextProcesser.CloseConversationText()
+                    ReplyOpen = False
+
+                elif Event.type == AudioEvent:
+                    Jobs.Spoken(Event.Text, Event.Audio, Event.Seconds)
 
                 if Time > 5:
-                    if InputProcesser.Event(Event, not (GeneratorLLM.IsProcessing or GeneratorTTS.IsProcessing)):
-
-                        # Get AI response
-                        ResponseAI = GeneratorLLM.StartInference(InputProcesser.Text)
-                        
-                        # Add user input to conversation visuals
-                        TextProcesser.AddConversatoinText(f"User > {InputProcesser.Text}", True)
-                        
+                    # Enter is held back while loading or the queue is full, the prompt stays in the input box
+                    if InputProcesser.Event(Event, Interactive and not Jobs.Full):
+                        Jobs.Submit(InputProcesser.Text)
                         InputProcesser.Text = ""
                 
                 if Event.type == QUIT:
@@ -257,6 +370,9 @@ try:
                         KeyboardPressedSound.play()
                         HeldKeys[Event.key] = True
                     
+                    if Event.key == K_F11 and USE_OPENGL:
+                        pygame.display.toggle_fullscreen()
+
                     if Time > 5:
                         if Event.key == K_UP:
                             TextProcesser.Scroll(-1)
@@ -264,10 +380,125 @@ try:
                         elif Event.key == K_DOWN:
                             TextProcesser.Scroll(1)
 
+                        # Escape drops the reply being made and every prompt waiting behind it
+                        elif Event.key == K_ESCAPE and Jobs is not None and Jobs.IsProcessing:
+                            if ReplyOpen:
+                                TextProcesser.AppendConversationText(" [Cancelled]")
+                                TextProcesser.CloseConversationText()
+                                ReplyOpen = False
+
+                            elif Jobs.Running is not None:
+                                TextProcesser.AddConversatoinText("GLaDOS > [Cancelled]", True)
+
+                            # Waiting prompts were never shown so they are shown now as cancelled
+                            for Cancelled in Jobs.Cancel():
+                                TextProcesser.AddConversatoinText(f"User > {Cancelled.Text} [Cancelled]", True)
+
+                elif Event.type == pygame.WINDOWSIZECHANGED and USE_OPENGL:
+                    # Letterbox the terminal into the new window size
+                    Graphics.Resize((Event.x, Event.y))
+
+                elif Event.type == pygame.WINDOWEXPOSED:
+                    # Window contents were lost so copy the whole display again
+                    ScreenExposed = True
+
                 elif Event.type == pygame.KEYUP:
                     # Remove the key from HeldKeys
                     HeldKeys.pop(Event.key)
             
+            Profiler.Mark("Events")
+
+            # Carry on with any large paste a chunk at a time
+            InputProcesser.Update()
+
+            if not Interactive and Jobs is not None and Time > 5:
+                Interactive = True
+                print(f"Window after {WindowTime or 0.0:.2f} s, interactive after {time.perf_counter() - LaunchTime:.2f} s, " + ", ".join(f"{Name.lower()} loaded in {Seconds:.2f} s" for Name, Seconds in Loader.LoadTimes.items()))
+
+            # Prompts are shown as they reach the model so replies never interleave
+            for Kind, Current in Jobs.Update() if Jobs is not None else []:
+                if Kind != "Skipped":
+                    TextProcesser.AddConversatoinText(f"User > {Current.Text}", True)
+
+                if Kind == "Cached":
+                    TextProcesser.AddConversatoinText(f"GLaDOS > {Current.Response}", True)
+
+                elif Kind == "Expired":
+                    TextProcesser.AddConversatoinText("GLaDOS > [Waited too long, ask again]", True)
+
+                if Settings["LogTurnStats"] and Kind != "Started":
+                    print(f"{Kind} {Current.Text!r} after waiting {Current.StartTime - Current.SubmitTime:.1f} s, queue: {Jobs.Summary()}")
+
+                    if Cache is not None:
+                        print(f"Cache hit rate: {Cache.HitRate * 100:.0f}%, saved: {Cache.SavedSeconds:.1f} s")
+
+            ## Pygame screen rendering #####################################################################
+
+            if Scheduler.ShouldRender(InputArrived):
+                Lines = TextProcesser.GetMainText(InputProcesser.GetInputText(), OverlayText, JobStatus()) if Time > 5 else TextProcesser.GetLoadingText()
+
+                DirtyRects = Graphics.UpdateText(Lines)
+                Profiler.Mark("Layout")
+
+                Graphics.Fade()
+                Profiler.Mark("Fade")
+
+                Graphics.DrawGlyphs()
+                Profiler.Mark("Glyphs")
+                    
+                ## OpenGL section ##############################################################################
+
+                try:
+                    if USE_OPENGL:
+                        # Use OpenGL rendering when available, only uploading what changed
+                        Graphics.Upload()
+                        Profiler.Mark("Upload")
+
+                        Graphics.Draw(Time)
+                        Profiler.Mark("Draw")
+
+                        # Update pygame window
+                        pygame.display.flip()
+                    elif CRT is not None:
+                        # The whole screen changes every frame with the effect on so there is nothing to diff
+                        CRT.Render(Graphics.Display, Screen, Time)
+                        Profiler.Mark("Draw")
+
+                        pygame.display.flip()
+                    else:
+                        # Use standard pygame rendering as fallback, only copying the changed regions
+                        if ScreenExposed:
+                            Screen.blit(Graphics.Display, (0, 0))
+                            pygame.display.flip()
+                            ScreenExposed = False
+                        else:
+                            for Row, Rect in DirtyRects:
+                                Screen.blit(Graphics.Display, Rect, Rect)
+                            pygame.display.update([Rect for Row, Rect in DirtyRects])
+                except Exception:
+                    break
+
+                Profiler.Mark("Present")
+
+                # The first frame on screen
+                if WindowTime is None:
+                    WindowTime = time.perf_counter() - LaunchTime
+
+                # Keystroke to screen latency for any input drawn in this frame
+                Profiler.Presented()
+                Scheduler.Rendered()
+
+                if Scheduler.StatsUpdated and Settings["LogFrameStats"]:
+                    print(f"FPS: {Scheduler.EffectiveFPS:.1f}, CPU: {Scheduler.CPUPerSecond * 100:.1f}%")
+
+                # Refresh the overlay once a second so it does not keep the screen busy
+                if Scheduler.StatsUpdated and Settings["Profiling"]["Overlay"]:
+                    OverlayText = Profiler.OverlayLines() + [f"FPS: {Scheduler.EffectiveFPS:.1f}  CPU: {Scheduler.CPUPerSecond * 100:.1f}%".ljust(46)]
+
+                # Time spent waiting on other threads, like text to speech, holding the GIL
+                Profiler.MeasureGIL()
+                Profiler.EndFrame()
+
         except Exception:
             break
             
@@ -276,5 +507,21 @@ except KeyboardInterrupt:
 except Exception:
     pass
 finally:
+    if GeneratorLLM is not None:
+        GeneratorLLM.Close()
+
+    elif Connection is not None:
+        Connection.Close()
+
+    Profiler.Close()
+
+    if Cache is not None:
+        Cache.Close()
+
+    TextProcesser.ConversationLines.Close()
+
+    if ConversationJournal is not None:
+        ConversationJournal.Close()
+
     pygame.quit()
     sys.exit()
@@ -0,0 +1,66 @@
+import moderngl as mgl
+
+class BloomPass:
+    def __init__(self, Context, QuadBuffer, VertexShader, Resolution):
+        self.Context = Context
+
+        with open("Shaders/Downsample.glsl") as File:
+            self.DownsampleProgram = Context.program(vertex_shader=VertexShader, fragment_shader=File.read())
+
+        with open("Shaders/Blur.glsl") as File:
+            self.BlurProgram = Context.program(vertex_shader=VertexShader, fragment_shader=File.read())
+
+        self.DownsampleObject = Context.vertex_array(self.DownsampleProgram, [(QuadBuffer, "2f 2f", "vert", "texcoord")])
+        self.BlurObject = Context.vertex_array(self.BlurProgram, [(QuadBuffer, "2f 2f", "vert", "texcoord")])
+
+        # Quarter size for the bloom, a sixteenth for the much wider bezel reflection
+        self.BloomTargets = [self.CreateTarget((Resolution[0] // 4, Resolution[1] // 4)) for Index in range(2)]
+        self.ReflectionTargets = [self.CreateTarget((Resolution[0] // 16, Resolution[1] // 16)) for Index in range(2)]
+
+        self.SourceSize = Resolution
+        self.HasRendered = False
+
+    def CreateTarget(self, Size):
+        Texture = self.Context.texture(Size, 4)
+        Texture.filter = (mgl.LINEAR, mgl.LINEAR)
+        Texture.repeat_x, Texture.repeat_y = False, False
+
+        return Texture, self.Context.framebuffer(color_attachments=[Texture])
+
+    def Downsample(self, Source, SourceSize, Target):
+        Target[1].use()
+        Source.use(0)
+
+        self.DownsampleProgram["Source"] = 0
+        self.DownsampleProgram["TexelSize"] = (1 / SourceSize[0], 1 / SourceSize[1])
+        self.DownsampleObject.render(mode=mgl.TRIANGLE_STRIP)
+
+    def Blur(self, Targets, Spread):
+        Size = Targets[0][0].size
+        self.BlurProgram["Source"] = 0
+
+        # Separable blur, horizontally into the spare target then vertically back again
+        for Source, Target, Direction in ((Targets[0], Targets[1], (Spread / Size[0], 0.0)), (Targets[1], Targets[0], (0.0, Spread / Size[1]))):
+            Target[1].use()
+            Source[0].use(0)
+
+            self.BlurProgram["Direction"] = Direction
+            self.BlurObject.render(mode=mgl.TRIANGLE_STRIP)
+
+    def Render(self, Source, Changed):
+        # Nothing to do when the screen content is the same as last time
+        if not Changed and self.HasRendered:
+            return False
+
+        self.Downsample(Source, self.SourceSize, self.BloomTargets[0])
+        self.Blur(self.BloomTargets, 1.0)
+
+        self.Downsample(self.BloomTargets[0][0], self.BloomTargets[0][0].size, self.ReflectionTargets[0])
+        self.Blur(self.ReflectionTargets, 2.0)
+
+        self.HasRendered = True
+        return True
+
+    def Use(self, BloomLocation, ReflectionLocation):
+        self.BloomTargets[0][0].use(BloomLocation)
+        self.ReflectionTargets[0][0].use(ReflectionLocation)
@@ -0,0 +1,74 @@
+def CountTokens(Text):
+    # Roughly four characters a token for english, plus a few for the message framing
+    return len(Text) // 4 + 4
+
+class ConversationHistory:
+    def __init__(self, SystemPrompt, TokenBudget=2048, KeepTurns=2):
+        self.TokenBudget = TokenBudget
+
+        # The most recent turns are always sent word for word
+        self.KeepTurns = KeepTurns
+
+        self.Clear(SystemPrompt)
+
+    def Clear(self, SystemPrompt):
+        self.System = {"role":"system", "content":SystemPrompt}
+        self.Summary = ""
+
+        # Each turn is its messages and their token count
+        self.Turns = []
+
+        # Oldest turns handed out to be summarized, still sent until the summary replaces them
+        self.Folding = []
+
+    @property
+    def Tokens(self):
+        return CountTokens(self.System["content"]) + (CountTokens(self.Summary) if self.Summary else 0) + sum(Tokens for Turn, Tokens in self.Folding + self.Turns)
+
+    def Messages(self, Prompt=None):
+        # The system prompt never changes and always comes first so ollama can reuse its cached evaluation,
+        # the summary changes now and then so it goes after it
+        Messages = [self.System]
+
+        if self.Summary:
+            Messages.append({"role":"system", "content":f"Summary of the conversation so far: {self.Summary}"})
+
+        for Turn, Tokens in self.Folding + self.Turns:
+            Messages += Turn
+
+        return Messages + ([Prompt] if Prompt else [])
+
+    def Restore(self, Summary, Turns):
+        # Picks up where an earlier session left off
+        self.Summary = Summary
+
+        for Prompt, Reply in Turns:
+            self.Add(Prompt, Reply)
+
+    def Add(self, Prompt, Reply):
+        self.Turns.append(([Prompt, Reply], CountTokens(Prompt["content"]) + CountTokens(Reply["content"])))
+
+    def TakeOverflow(self):
+        # Oldest turns that push the history over budget, only one batch is folded at a time
+        if self.Folding or self.Tokens <= self.TokenBudget:
+            return None
+
+        Count, Tokens = 0, self.Tokens
+
+        while Count < len(self.Turns) - self.KeepTurns and Tokens > self.TokenBudget:
+            Tokens -= self.Turns[Count][1]
+            Count += 1
+
+        if not Count:
+            return None
+
+        self.Folding, self.Turns = self.Turns[:Count], self.Turns[Count:]
+        return [Message for Turn, Tokens in self.Folding for Message in Turn]
+
+    def Fold(self, Summary):
+        # The new summary already covers the old one and the folded turns
+        self.Summary, self.Folding = Summary, []
+
+    def Unfold(self):
+        # Summarizing failed so the turns go back as they were
+        self.Turns, self.Folding = self.Folding + self.Turns, []
@@ -0,0 +1,22 @@
+import os
+
+try:
+    import fcntl
+except ImportError:
+    import msvcrt
+    fcntl = None
+
+def LockDirectory(Path):
+    # Held by the returned file until it is closed, the os drops it if the terminal crashes
+    LockFile = open(os.path.join(Path, "Lock"), "a")
+
+    try:
+        if fcntl is not None:
+            fcntl.flock(LockFile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(LockFile.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        LockFile.close()
+        raise RuntimeError(f"{Path} is open in another terminal")
+
+    return LockFile
@@ -0,0 +1,65 @@
+import pygame
+
+class FrameDiff:
+    def __init__(self, FontSize, GlyphWidth, Resolution, SettleFrames=30):
+        self.FontSize = FontSize
+        self.GlyphWidth = GlyphWidth
+        self.Resolution = Resolution
+
+        # Frames a changed cell needs before the fade and redraw stop changing its pixels
+        self.SettleFrames = SettleFrames
+
+        self.PreviousLines = []
+        self.ActiveRows = {} # Row -> [Start column, End column, Frames left]
+
+    def Reset(self):
+        self.PreviousLines = []
+        self.ActiveRows = {}
+
+    def Update(self, Lines):
+        for Row in range(max(len(Lines), len(self.PreviousLines))):
+            Old = self.PreviousLines[Row] if Row < len(self.PreviousLines) else ""
+            New = Lines[Row] if Row < len(Lines) else ""
+
+            if Old == New:
+                continue
+
+            # Find the changed column span, treating a missing character as a space
+            Length = max(len(Old), len(New))
+            Old, New = Old.ljust(Length), New.ljust(Length)
+
+            Start = 0
+            while Start < Length and Old[Start] == New[Start]:
+                Start += 1
+
+            if Start == Length:
+                continue
+
+            End = Length
+            while Old[End - 1] == New[End - 1]:
+                End -= 1
+
+            # Grow the rows span if it is still settling from an earlier change
+            if Row in self.ActiveRows:
+                Start = min(Start, self.ActiveRows[Row][0])
+                End = max(End, self.ActiveRows[Row][1])
+
+            self.ActiveRows[Row] = [Start, End, self.SettleFrames]
+
+        self.PreviousLines = list(Lines)
+
+        # Get pixel rects for every span that still needs processing this frame
+        Rects = []
+
+        for Row, Span in list(self.ActiveRows.items()):
+            Start, End = Span[0] * self.FontSize[0], Span[1] * self.FontSize[0] + self.GlyphWidth - self.FontSize[0]
+            Rects.append((Row, pygame.Rect(Start, Row * self.FontSize[1], End - Start, self.FontSize[1]).clip((0, 0), self.Resolution)))
+
+            Span[2] -= 1
+            if Span[2] <= 0:
+                del self.ActiveRows[Row]
+
+        return Rects
+
+    def IsIdle(self):
+        return not self.ActiveRows
@@ -0,0 +1,111 @@
+import time, json, threading
+from collections import deque
+
+class FrameProfiler:
+    def __init__(self, Enabled=False, TracePath="", Window=30):
+        self.Enabled = Enabled or bool(TracePath)
+
+        # Durations of each stage over the last few frames
+        self.Window = Window
+        self.History = {}
+
+        self.Frame = 0
+        self.FrameStart = self.LastMark = 0.0
+        self.Stages = []
+
+        # When the oldest input not yet on screen was taken off the event queue
+        self.InputTime = None
+
+        self.TraceFile = None
+        self.ChromeTrace = False
+
+        if self.Enabled and TracePath:
+            # Chrome traces are a json array that is allowed to be left open, so frames can be streamed out
+            self.TraceFile = open(TracePath, "w")
+            self.ChromeTrace = not TracePath.endswith(".jsonl")
+
+            if self.ChromeTrace:
+                self.TraceFile.write("[\n")
+
+    def BeginFrame(self):
+        if not self.Enabled:
+            return
+
+        self.FrameStart = self.LastMark = time.perf_counter()
+        self.Stages = []
+
+    def Mark(self, Stage):
+        # Everything since the previous mark is counted as this stage
+        if not self.Enabled:
+            return
+
+        Now = time.perf_counter()
+        self.Stages.append((Stage, self.LastMark, Now - self.LastMark))
+        self.LastMark = Now
+
+    def InputArrived(self):
+        if self.Enabled and self.InputTime is None:
+            self.InputTime = time.perf_counter()
+
+    def Presented(self):
+        # Keystroke to screen latency, recorded like a stage so it shows up in the overlay and traces
+        if not self.Enabled or self.InputTime is None:
+            return
+
+        self.Stages.append(("Latency", self.InputTime, time.perf_counter() - self.InputTime))
+        self.InputTime = None
+
+    def MeasureGIL(self):
+        # Sleeping zero yields the GIL, getting it back takes long when another thread is holding it
+        if not self.Enabled:
+            return
+
+        self.LastMark = time.perf_counter()
+        time.sleep(0)
+        self.Mark("GIL")
+
+    def EndFrame(self):
+        if not self.Enabled:
+            return
+
+        self.Stages.append(("Total", self.FrameStart, time.perf_counter() - self.FrameStart))
+
+        for Stage, Start, Duration in self.Stages:
+            if Stage not in self.History:
+                self.History[Stage] = deque(maxlen=self.Window)
+
+            self.History[Stage].append(Duration)
+
+        if self.TraceFile is not None:
+            self.WriteTrace()
+
+        self.Frame += 1
+
+    def WriteTrace(self):
+        if not self.ChromeTrace:
+            Record = {"Frame": self.Frame, "Start": self.FrameStart, "Stages": {Stage: Duration * 1000 for Stage, Start, Duration in self.Stages}}
+            self.TraceFile.write(json.dumps(Record) + "\n")
+            return
+
+        ThreadID = threading.get_ident()
+
+        for Stage, Start, Duration in self.Stages:
+            Event = {"name": Stage, "ph": "X", "ts": Start * 1e6, "dur": Duration * 1e6, "pid": 0, "tid": ThreadID, "args": {"Frame": self.Frame}}
+            self.TraceFile.write(json.dumps(Event) + ",\n")
+
+    def Summary(self):
+        # Average and worst time in milliseconds for every stage
+        return {Stage: (sum(Values) / len(Values) * 1000, max(Values) * 1000) for Stage, Values in self.History.items() if Values}
+
+    def OverlayLines(self, Width=46):
+        Lines = [f"{'Stage':<10}{'Avg ms':>10}{'Max ms':>10}".ljust(Width)]
+
+        for Stage, (Average, Worst) in self.Summary().items():
+            Lines.append(f"{Stage:<10}{Average:>10.2f}{Worst:>10.2f}".ljust(Width))
+
+        return Lines
+
+    def Close(self):
+        if self.TraceFile is not None:
+            self.TraceFile.close()
+            self.TraceFile = None
@@ -0,0 +1,89 @@
+import time, pygame
+
+class FrameScheduler:
+    def __init__(self, ActiveFPS, IdleFPS, IdleDelay, HiddenFPS=5):
+        self.ActiveFPS = ActiveFPS
+        self.IdleFPS = IdleFPS
+        self.HiddenFPS = HiddenFPS
+
+        # Seconds without any activity before dropping to the idle rate
+        self.IdleDelay = IdleDelay
+        self.LastActivity = time.time()
+
+        self.Visible = True
+        self.Rate = ActiveFPS
+        self.NextFrame = time.perf_counter()
+
+        # Stats over the last full second
+        self.EffectiveFPS = 0.0
+        self.CPUPerSecond = 0.0
+        self.StatsUpdated = False
+
+        self.RenderedFrames = 0
+        self.StatsStart = time.perf_counter()
+        self.CPUStart = time.process_time()
+
+    def Activity(self):
+        self.LastActivity = time.time()
+
+    def WindowEvent(self, Event):
+        if Event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN):
+            self.Visible = False
+
+        elif Event.type in (pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWEXPOSED, pygame.WINDOWMAXIMIZED, pygame.WINDOWSIZECHANGED):
+            self.Visible = True
+            self.Activity()
+
+    def Wait(self, Busy):
+        if Busy:
+            self.Activity()
+
+        # Keep handling events while hidden but never render, otherwise only run fast while something changes
+        if not self.Visible:
+            self.Rate = self.HiddenFPS
+        elif time.time() - self.LastActivity < self.IdleDelay:
+            self.Rate = self.ActiveFPS
+        else:
+            self.Rate = self.IdleFPS
+
+        # Sleep until an event arrives or the next frame is due, so input is handled as soon as it comes in
+        Timeout = self.NextFrame - time.perf_counter()
+        Events = []
+
+        if Timeout > 0:
+            Event = pygame.event.wait(max(1, int(Timeout * 1000)))
+
+            if Event.type != pygame.NOEVENT:
+                Events.append(Event)
+
+        return Events + pygame.event.get()
+
+    def ShouldRender(self, InputArrived):
+        Due = time.perf_counter() >= self.NextFrame
+
+        # Hidden frames are skipped but still scheduled so the loop keeps sleeping
+        if Due and not self.Visible:
+            self.NextFrame = time.perf_counter() + 1 / self.Rate
+
+        # Input is drawn straight away, everything else waits for its frame
+        return self.Visible and (InputArrived or Due)
+
+    def Rendered(self):
+        # Schedule from the previous frame so the rate holds, unless too far behind to catch up
+        self.NextFrame = max(self.NextFrame + 1 / self.Rate, time.perf_counter())
+        self.RenderedFrames += 1
+
+        self.UpdateStats()
+
+    def UpdateStats(self):
+        Elapsed = time.perf_counter() - self.StatsStart
+        self.StatsUpdated = Elapsed >= 1.0
+
+        if self.StatsUpdated:
+            CPUTime = time.process_time()
+
+            self.EffectiveFPS = self.RenderedFrames / Elapsed
+            self.CPUPerSecond = (CPUTime - self.CPUStart) / Elapsed
+
+            self.RenderedFrames = 0
+            self.StatsStart, self.CPUStart = time.perf_counter(), CPUTime
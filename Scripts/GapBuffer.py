@@ -0,0 +1,58 @@
+class GapBuffer:
+    def __init__(self, Capacity=64):
+        # Characters live either side of a gap that sits at the last edit position
+        self.Buffer = [""] * Capacity
+        self.GapStart = 0
+        self.GapEnd = Capacity
+
+    def __len__(self):
+        return len(self.Buffer) - (self.GapEnd - self.GapStart)
+
+    def __str__(self):
+        return "".join(self.Buffer[:self.GapStart]) + "".join(self.Buffer[self.GapEnd:])
+
+    def MoveGap(self, Position):
+        # Only the characters between the old and new position are moved
+        if Position < self.GapStart:
+            Amount = self.GapStart - Position
+            self.Buffer[self.GapEnd - Amount:self.GapEnd] = self.Buffer[Position:self.GapStart]
+            self.GapStart, self.GapEnd = Position, self.GapEnd - Amount
+
+        elif Position > self.GapStart:
+            Amount = Position - self.GapStart
+            self.Buffer[self.GapStart:Position] = self.Buffer[self.GapEnd:self.GapEnd + Amount]
+            self.GapStart, self.GapEnd = Position, self.GapEnd + Amount
+
+    def Grow(self, Needed):
+        # Doubling keeps inserts amortized constant time
+        Extra = max(Needed, len(self.Buffer))
+        self.Buffer[self.GapEnd:self.GapEnd] = [""] * Extra
+        self.GapEnd += Extra
+
+    def Insert(self, Position, Text):
+        self.MoveGap(Position)
+
+        if self.GapEnd - self.GapStart < len(Text):
+            self.Grow(len(Text))
+
+        self.Buffer[self.GapStart:self.GapStart + len(Text)] = Text
+        self.GapStart += len(Text)
+
+    def Delete(self, Position, Amount=1):
+        # Removes the characters just before the position, like backspace
+        Amount = min(Amount, Position)
+        self.MoveGap(Position)
+        self.GapStart -= Amount
+
+    def Slice(self, Start, End):
+        # Copy out a range without building the whole string
+        End = min(End, len(self))
+        Gap = self.GapEnd - self.GapStart
+
+        Before = self.Buffer[Start:min(End, self.GapStart)] if Start < self.GapStart else []
+        After = self.Buffer[max(Start, self.GapStart) + Gap:End + Gap] if End > self.GapStart else []
+
+        return "".join(Before) + "".join(After)
+
+    def Clear(self):
+        self.GapStart, self.GapEnd = 0, len(self.Buffer)
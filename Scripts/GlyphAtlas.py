@@ -0,0 +1,74 @@
+import pygame
+
+# Every character the terminal draws by default, anything else is added on first use
+DefaultCharacters = [chr(Code) for Code in range(33, 127)] + ["█", "°"]
+
+class GlyphAtlas:
+    def __init__(self, Font, FontSize, Colors, Characters=DefaultCharacters, Columns=32):
+        self.Font = Font
+        self.FontSize = FontSize
+        self.Columns = Columns
+
+        # Glyphs are wider than a cell so each atlas cell fits the largest glyph
+        Sizes = [Font.size(Character) for Character in Characters]
+        self.CellSize = [max(Size[0] for Size in Sizes), max(Size[1] for Size in Sizes)]
+
+        self.Indices = {}
+        self.Rects = []
+        self.Surfaces = {tuple(Color): self.CreateSurface(len(Characters)) for Color in Colors}
+
+        for Character in Characters:
+            self.AddGlyph(Character)
+
+    def CreateSurface(self, Count):
+        Rows = max(1, -(-Count // self.Columns))
+        Surface = pygame.Surface((self.Columns * self.CellSize[0], Rows * self.CellSize[1]), pygame.SRCALPHA)
+        Surface.fill((0, 0, 0, 0))
+        return Surface
+
+    def AddGlyph(self, Character):
+        Index = len(self.Rects)
+        Position = [(Index % self.Columns) * self.CellSize[0], (Index // self.Columns) * self.CellSize[1]]
+
+        # Grow every atlas when it runs out of rows
+        for Color, Surface in self.Surfaces.items():
+            if Position[1] + self.CellSize[1] > Surface.get_height():
+                Grown = self.CreateSurface(Index * 2)
+                Grown.blit(Surface, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+                self.Surfaces[Color] = Surface = Grown
+
+            # Copy the glyph as is, including its alpha, into the atlas cell
+            Glyph = self.Font.render(Character, True, Color)
+            Surface.blit(Glyph, Position, special_flags=pygame.BLEND_RGBA_MAX)
+
+        Size = self.Font.size(Character)
+        self.Rects.append(pygame.Rect(Position, (min(Size[0], self.CellSize[0]), min(Size[1], self.CellSize[1]))))
+        self.Indices[Character] = Index
+
+        return Index
+
+    def GetIndex(self, Character):
+        Index = self.Indices.get(Character)
+        return self.AddGlyph(Character) if Index is None else Index
+
+    def RenderLine(self, Surface, Text, Position, Color):
+        X, Y = Position
+
+        # Spaces have no pixels so skip them entirely. New glyphs grow the atlas, so look them all up before taking it
+        Indices = [(Count, self.GetIndex(Letter)) for Count, Letter in enumerate(Text) if Letter != " "]
+        Atlas, Rects = self.Surfaces[tuple(Color)], self.Rects
+
+        Surface.blits([(Atlas, (X + Count * self.FontSize[0], Y), Rects[Index]) for Count, Index in Indices], doreturn=False)
+
+    def RenderRegion(self, Surface, Text, Rect, Color):
+        # Glyphs overhang their cell so draw every glyph touching the rect, clipped to it
+        First = max(0, (Rect.left - self.CellSize[0]) // self.FontSize[0] + 1)
+        Last = -(-Rect.right // self.FontSize[0])
+
+        Surface.set_clip(Rect)
+        self.RenderLine(Surface, Text[First:Last], (First * self.FontSize[0], Rect.top), Color)
+        Surface.set_clip(None)
+
+    def RenderGrid(self, Surface, Lines, Color):
+        for Line, Text in enumerate(Lines):
+            self.RenderLine(Surface, Text, (0, Line * self.FontSize[1]), Color)
@@ -0,0 +1,180 @@
+import time, itertools
+import numpy as np
+from collections import deque
+
+from .ResponseCache import ResponseCache
+
+class Job:
+    def __init__(self, JobID, Text):
+        self.ID = JobID
+        self.Text = Text
+
+        # Filled in as the job moves through generating and speaking
+        self.Key = None
+        self.RequestID = None
+        self.Response = None
+        self.Stats = None
+
+        self.SubmitTime = time.perf_counter()
+        self.StartTime = None
+        self.GeneratedTime = None
+
+class JobScheduler:
+    def __init__(self, LLM, TTS, Cache=None, MaxQueue=4, QueueTimeout=60, GenerateTimeout=None, SpeakTimeout=30):
+        self.LLM = LLM
+        self.TTS = TTS
+        self.Cache = Cache
+
+        # Prompts waiting for the model, once full new ones are turned away rather than dropped
+        self.MaxQueue = MaxQueue
+        self.Queue = deque()
+        self.JobIDs = itertools.count(1)
+
+        # Seconds a prompt may wait for the model, the model may take, and a reply may wait for the voice
+        self.QueueTimeout = QueueTimeout
+        self.GenerateTimeout = GenerateTimeout
+        self.SpeakTimeout = SpeakTimeout
+
+        # One reply is generated at a time so each one sees the turns before it, the next can generate while one is spoken
+        self.Running = None
+        self.SpeechQueue = deque()
+
+        # Replies waiting on their speech before they can be cached, by reply text
+        self.PendingCache = {}
+
+        # The latest turns as this thread has seen them finish, for cache keys. The models own history is changed on its
+        # loop thread a moment later, so a cached turn would not be in it yet when the next prompt is keyed
+        ContextTurns = Cache.ContextTurns if Cache is not None else 0
+        self.RecentTurns = deque(list(LLM.History.Turns)[-ContextTurns:] if ContextTurns else [], maxlen=ContextTurns)
+
+        # Seconds each prompt waited for the model and each reply waited for the voice
+        self.QueueWaits = []
+        self.SpeechWaits = []
+        self.Coalesced = self.Rejected = self.Expired = self.Skipped = 0
+
+    @property
+    def QueueDepth(self):
+        return len(self.Queue)
+
+    @property
+    def Full(self):
+        return len(self.Queue) >= self.MaxQueue
+
+    @property
+    def IsProcessing(self):
+        return bool(self.Queue or self.Running or self.SpeechQueue)
+
+    def Submit(self, Text):
+        # The same prompt typed again while it is still waiting only runs once
+        for Waiting in self.Queue:
+            if ResponseCache.Normalize(Waiting.Text) == ResponseCache.Normalize(Text):
+                self.Coalesced += 1
+                return Waiting
+
+        if self.Full:
+            self.Rejected += 1
+            return None
+
+        self.Queue.append(Job(next(self.JobIDs), Text))
+        return self.Queue[-1]
+
+    def Update(self):
+        # Start whatever can run now, returns what happened as (kind, job) pairs for the screen
+        Notices = []
+
+        while self.Queue and self.Running is None:
+            Current = self.Queue.popleft()
+            Current.StartTime = time.perf_counter()
+            self.QueueWaits.append(Current.StartTime - Current.SubmitTime)
+
+            # Prompts that waited too long are likely stale, the user has moved on
+            if Current.StartTime - Current.SubmitTime > self.QueueTimeout:
+                self.Expired += 1
+                Notices.append(("Expired", Current))
+                continue
+
+            # Keyed on the history as it is now that every earlier reply has finished
+            if self.Cache is not None:
+                Current.Key = self.Cache.Key(Current.Text, self.LLM.Model, list(self.RecentTurns))
+                Cached = self.Cache.Get(Current.Key)
+
+                if Cached is not None:
+                    Current.Response, Current.GeneratedTime, Current.Key = Cached["Response"], Current.StartTime, None
+                    self.LLM.AddTurn(Current.Text, Current.Response)
+                    self.KeepTurn(Current)
+                    self.SpeechQueue.append((Current, Cached["Audio"]))
+                    Notices.append(("Cached", Current))
+                    continue
+
+            Current.RequestID = self.LLM.StartInference(Current.Text, self.GenerateTimeout)
+            self.Running = Current
+            Notices.append(("Started", Current))
+
+        # The voice only takes one reply at a time, replies that waited too long are shown but not spoken
+        while self.SpeechQueue and not self.TTS.IsProcessing:
+            Current, Audio = self.SpeechQueue.popleft()
+            Wait = time.perf_counter() - Current.GeneratedTime
+            self.SpeechWaits.append(Wait)
+
+            if Wait > self.SpeakTimeout:
+                self.Skipped += 1
+                self.PendingCache.pop(Current.Response, None)
+                Notices.append(("Skipped", Current))
+                continue
+
+            self.TTS.StartInference(Current.Response, Audio)
+
+        return Notices
+
+    def Generated(self, RequestID, Response, Stats):
+        # Called with every finished reply, returns its job or None if it belongs to nothing still running
+        if self.Running is None or self.Running.RequestID != RequestID:
+            return None
+
+        Current, self.Running = self.Running, None
+        Current.Response, Current.Stats, Current.GeneratedTime = Response, Stats, time.perf_counter()
+
+        if Response is not None:
+            self.KeepTurn(Current)
+
+            if Current.Key is not None:
+                self.PendingCache[Response] = (Current.Key, Stats["Total"])
+
+            self.SpeechQueue.append((Current, None))
+
+        return Current
+
+    def KeepTurn(self, Current):
+        # Shaped like the historys own turns, only the messages are used
+        self.RecentTurns.append(([{"role":"user", "content":Current.Text}, {"role":"assistant", "content":Current.Response}], 0))
+
+    def Spoken(self, Text, Audio, Seconds):
+        # Every later hit saves both the generation and the speech synthesis time
+        if Text in self.PendingCache:
+            Key, GenerateSeconds = self.PendingCache.pop(Text)
+            self.Cache.Put(Key, Text, Audio, GenerateSeconds + Seconds)
+
+    def Cancel(self):
+        # Drop the running reply and everything waiting, nothing more is spoken, returns the prompts that never started
+        if self.Running is not None:
+            self.LLM.Cancel(self.Running.RequestID)
+
+        Dropped = list(self.Queue)
+        self.Queue.clear()
+        self.SpeechQueue.clear()
+        self.Running = None
+
+        # A reply still being spoken was cancelled too, so it is not cached when it finishes
+        self.PendingCache.clear()
+
+        return Dropped
+
+    def Summary(self):
+        Waits = self.QueueWaits or [0.0]
+        SpeechWaits = self.SpeechWaits or [0.0]
+
+        return {
+            "QueueDepth": len(self.Queue), "WaitP50": float(np.percentile(Waits, 50)), "WaitMax": max(Waits),
+            "SpeechWaitP50": float(np.percentile(SpeechWaits, 50)), "SpeechWaitMax": max(SpeechWaits),
+            "Coalesced": self.Coalesced, "Rejected": self.Rejected, "Expired": self.Expired, "Skipped": self.Skipped,
+        }
@@ -0,0 +1,171 @@
+import os, json, time, queue, threading
+
+from .Scrollback import EncodeRecord
+from .DirectoryLock import LockDirectory
+from .ConversationHistory import CountTokens
+
+class Journal:
+    def __init__(self, Path, Resume=True, Width=46, FsyncInterval=1.0):
+        os.makedirs(Path, exist_ok=True)
+
+        # Held while the journal is open so two terminals can never write the same one
+        self.LockFile = LockDirectory(Path)
+
+        # Turns and summaries as json lines, and the wrapped scrollback as fixed size records like the spill file
+        self.TurnsPath = os.path.join(Path, "Turns.jsonl")
+        self.LinesPath = os.path.join(Path, "Lines.bin")
+        self.RecordSize = Width * 4
+
+        # Anything from an earlier session is kept to one side when not resuming
+        if not Resume:
+            for FilePath in (self.TurnsPath, self.LinesPath):
+                if os.path.exists(FilePath):
+                    os.replace(FilePath, FilePath + ".old")
+
+        self.Resumed = self.Repair()
+
+        # Turns are numbered across sessions so a summary can say which turns it covers
+        self.TurnCount = self.LastTurn()
+
+        # Writes are only queued here, a background thread writes them and syncs to disk at most once per interval
+        self.FsyncInterval = FsyncInterval
+        self.Queue = queue.Queue()
+
+        self.WriterThread = threading.Thread(target=self.WriteTask)
+        self.WriterThread.daemon = True
+        self.WriterThread.start()
+
+    def Repair(self):
+        # A crash can leave half a record at the end, cut it off so new ones line up. Returns whether anything is left
+        Resumed = False
+
+        if os.path.exists(self.LinesPath):
+            Size = os.path.getsize(self.LinesPath)
+            os.truncate(self.LinesPath, Size - Size % self.RecordSize)
+            Resumed = Size >= self.RecordSize
+
+        if os.path.exists(self.TurnsPath):
+            with open(self.TurnsPath, "rb+") as File:
+                End = File.seek(0, os.SEEK_END)
+
+                # Back to the last complete line, only the end of the file is read
+                while End > 0:
+                    Start = max(0, End - 4096)
+                    File.seek(Start)
+                    Newline = File.read(End - Start).rfind(b"\n")
+
+                    if Newline != -1:
+                        End = Start + Newline + 1
+                        break
+
+                    End = Start
+
+                File.truncate(End)
+                Resumed = Resumed or End > 0
+
+        return Resumed
+
+    def ReadBackwards(self):
+        # Records from newest to oldest, a block at a time so only as much as needed is read
+        if not os.path.exists(self.TurnsPath):
+            return
+
+        with open(self.TurnsPath, "rb") as File:
+            File.seek(0, os.SEEK_END)
+            Position, Remainder = File.tell(), b""
+
+            while Position > 0:
+                Start = max(0, Position - 65536)
+                File.seek(Start)
+                Lines = (File.read(Position - Start) + Remainder).split(b"\n")
+                Position, Remainder = Start, Lines.pop(0)
+
+                for Line in reversed(Lines):
+                    if Line:
+                        yield json.loads(Line)
+
+            if Remainder:
+                yield json.loads(Remainder)
+
+    def LastTurn(self):
+        # Summaries are written after the turn that triggered them and cover fewer turns, so only turns count
+        for Record in self.ReadBackwards():
+            if Record["Type"] == "Turn":
+                return Record["Index"]
+
+        return 0
+
+    def ReadHistory(self, TokenBudget):
+        # The latest summary and the turns after it, newest first until the budget is spent, so resuming costs the same however long the journal
+        Summary, Through, Turns, Tokens = "", None, [], 0
+
+        for Record in self.ReadBackwards():
+            if Record["Type"] == "Summary":
+                if Through is None:
+                    Summary, Through = Record["Text"], Record["Through"]
+
+            elif Through is not None and Record["Index"] <= Through:
+                break
+
+            else:
+                Tokens += CountTokens(Record["Prompt"]["content"]) + CountTokens(Record["Reply"]["content"])
+
+                if Turns and Tokens > TokenBudget:
+                    break
+
+                Turns.append((Record["Prompt"], Record["Reply"]))
+
+        return Summary, Turns[::-1]
+
+    def AddTurn(self, Prompt, Reply):
+        self.TurnCount += 1
+        self.Queue.put(("Turns", {"Type": "Turn", "Index": self.TurnCount, "Prompt": Prompt, "Reply": Reply}))
+
+    def AddSummary(self, Summary, RemainingTurns):
+        # Covers every turn but the ones still kept word for word
+        self.Queue.put(("Turns", {"Type": "Summary", "Through": self.TurnCount - RemainingTurns, "Text": Summary}))
+
+    def AddLines(self, Lines):
+        if Lines:
+            self.Queue.put(("Lines", Lines))
+
+    def WriteTask(self):
+        with open(self.TurnsPath, "ab") as TurnsFile, open(self.LinesPath, "ab") as LinesFile:
+            LastSync, Dirty, Closing = time.perf_counter(), False, False
+
+            while not Closing:
+                # Wait for more writes, or until the next sync is due if anything is still unsynced
+                try:
+                    Items = [self.Queue.get(timeout=max(0.0, LastSync + self.FsyncInterval - time.perf_counter()) if Dirty else None)]
+                except queue.Empty:
+                    Items = []
+
+                # Everything queued meanwhile goes out in the same batch
+                while True:
+                    try:
+                        Items.append(self.Queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                for Kind, Data in Items:
+                    if Kind == "Turns":
+                        TurnsFile.write(json.dumps(Data).encode("utf-8") + b"\n")
+                    elif Kind == "Lines":
+                        LinesFile.write(b"".join(EncodeRecord(Line, self.RecordSize) for Line in Data))
+                    else:
+                        Closing = True
+
+                Dirty = Dirty or bool(Items)
+
+                if Dirty and (Closing or time.perf_counter() - LastSync >= self.FsyncInterval):
+                    for File in (TurnsFile, LinesFile):
+                        File.flush()
+                        os.fsync(File.fileno())
+
+                    LastSync, Dirty = time.perf_counter(), False
+
+    def Close(self):
+        # Waits for everything queued to be written and synced
+        self.Queue.put(("Close", None))
+        self.WriterThread.join()
+        self.LockFile.close()
@@ -1,51 +1,252 @@
-import re, ollama, os, threading, queue
+import re, ollama, os, asyncio, threading, itertools, time
+
+from .ConversationHistory import ConversationHistory, CountTokens
+
+SummaryPrompt = "Summarize this conversation in under 100 words. Keep names, facts and anything the user asked you to remember. Reply with only the summary."
 
 class LargeLanguageModel:
-    def __init__(self, ModelName, SystemPrompt):
+    def __init__(self, ModelName, SystemPrompt, OnToken=None, OnResponse=None, Timeout=120, TokenBudget=2048, KeepTurns=2, KeepAlive="30m", KeepWarmInterval=240, Host=None, Journal=None):
         self.Model = ModelName
-        self.History = [{"role":"system", "content":SystemPrompt}]
 
-        self.ResponseQueue = queue.Queue()
-        self.InferenceThread = None
-        self.IsProcessing = False
-        
-        # Warm start the model
-        ollama.chat(model=self.Model, messages=[{"role":"user", "content":"Say one word."}])
+        # Address of the ollama server, the default local one when None
+        self.Host = Host
+
+        # How long ollama keeps the model loaded after each request, and how often an idle terminal pings it to stay loaded
+        self.KeepAlive = KeepAlive
+        self.KeepWarmInterval = KeepWarmInterval
+        self.LastActivity = time.perf_counter()
+
+        # Recent turns within the token budget, older ones are folded into a summary in the background
+        self.History = ConversationHistory(SystemPrompt, TokenBudget, KeepTurns)
+
+        # Requests can also be made against other histories, like one per client of the model server,
+        # each gets its own summary in the background
+        self.SummaryTasks = {}
+
+        # Every turn and summary is also written here so the conversation can be resumed, and resumed from it now
+        self.Journal = Journal
+
+        if Journal is not None and Journal.Resumed:
+            self.History.Restore(*Journal.ReadHistory(TokenBudget))
+
+        # Called from the event loop thread with each fragment as it arrives, then with the whole response and its stats,
+        # both tagged with the id StartInference returned. A failed or timed out request gets a response of None
+        self.OnToken = OnToken
+        self.OnResponse = OnResponse
+
+        # Seconds a request may take before it is abandoned
+        self.Timeout = Timeout
+
+        # Requests still running, by id
+        self.Requests = {}
+        self.RequestIDs = itertools.count(1)
+
+        # Time to first token and generation speed of every turn
+        self.TurnStats = []
+
+        # One event loop on a background thread drives every request over a single reused http session
+        self.Loop = asyncio.new_event_loop()
+        self.LoopThread = threading.Thread(target=self.Loop.run_forever)
+        self.LoopThread.daemon = True
+        self.LoopThread.start()
+
+        self.Client = self.Run(self.CreateClient())
+
+        # Warm start the model, through the real system prompt so ollama already has that prefix cached for the first turn
+        self.Run(self.Client.chat(
+            model=self.Model, messages=self.History.Messages({"role":"user", "content":"Say one word."}),
+            options={"num_predict":1}, keep_alive=self.KeepAlive
+        ))
+
+        self.KeepWarmTask = asyncio.run_coroutine_threadsafe(self.KeepWarm(), self.Loop) if KeepWarmInterval > 0 else None
+
+    async def CreateClient(self):
+        # Made on the loop so its connection pool belongs to it
+        return ollama.AsyncClient(self.Host)
+
+    def Run(self, Coroutine):
+        # Wait for a coroutine on the loop, only used for setup
+        return asyncio.run_coroutine_threadsafe(Coroutine, self.Loop).result()
+
+    async def KeepWarm(self):
+        while True:
+            await asyncio.sleep(self.KeepWarmInterval)
+
+            # An empty chat only loads the model, it leaves the cached prompt alone and any real request does the same job
+            if self.Requests or time.perf_counter() - self.LastActivity < self.KeepWarmInterval:
+                continue
+
+            try:
+                await self.Client.chat(model=self.Model, messages=[], keep_alive=self.KeepAlive)
+                self.LastActivity = time.perf_counter()
+            except Exception:
+                pass
+
+    def Unload(self):
+        # Drop the model from memory, the next request then measures a cold start
+        self.Run(self.Client.chat(model=self.Model, messages=[], keep_alive=0))
+
+    @property
+    def IsProcessing(self):
+        return bool(self.Requests)
 
     def ClearHistory(self, SystemPrompt):
-        self.History = [{"role":"system", "content":SystemPrompt}]
+        self.History.Clear(SystemPrompt)
+
+    def AddTurn(self, Text, Response, History=None):
+        # A turn answered without the model, like a cached reply, still belongs in the conversation
+        self.Loop.call_soon_threadsafe(self.AddTurnTask, Text, Response, History or self.History)
+
+    def AddTurnTask(self, Text, Response, History):
+        self.KeepTurn(History, {"role":"user", "content":Text}, {"role":"assistant", "content":Response})
+
+    def KeepTurn(self, History, Prompt, Reply):
+        History.Add(Prompt, Reply)
+
+        if self.Journal is not None and History is self.History:
+            self.Journal.AddTurn(Prompt, Reply)
+
+        self.StartSummary(History)
+
+    def StartInference(self, Text, Timeout=None, History=None):
+        # Never blocks, any number of requests can run at once
+        RequestID = next(self.RequestIDs)
+
+        Future = asyncio.run_coroutine_threadsafe(self.InferenceTask(RequestID, Text, Timeout or self.Timeout, History or self.History), self.Loop)
+        self.Requests[RequestID] = Future
+        Future.add_done_callback(lambda Done: self.Requests.pop(RequestID, None))
+
+        return RequestID
+
+    def Cancel(self, RequestID=None):
+        # Stop one request or all of them, closing the stream also stops ollama generating
+        for ID, Future in list(self.Requests.items()):
+            if RequestID is None or ID == RequestID:
+                Future.cancel()
+
+    async def Generate(self, RequestID, Messages):
+        PromptTokens = sum(CountTokens(Message["content"]) for Message in Messages)
+        StartTime = time.perf_counter()
+        IdleTime, self.LastActivity = StartTime - self.LastActivity, StartTime
+        FirstTokenTime = None
+        Content, Response, Final = "", "", {}
 
-    def StartInference(self, Text):
-        if not self.IsProcessing:
-            self.IsProcessing = True
-            self.InferenceThread = threading.Thread(target=self.InferenceTask, args=(Text,))
-            self.InferenceThread.daemon = True
-            self.InferenceThread.start()
+        async for Chunk in await self.Client.chat(model=self.Model, messages=Messages, stream=True, keep_alive=self.KeepAlive):
+            Content += Chunk["message"]["content"]
+
+            # Remove new lines, and any white space before the first word
+            Fragment = Chunk["message"]["content"].replace("\n", " ")
+            Fragment = Fragment if FirstTokenTime is not None else Fragment.lstrip()
+
+            if Fragment:
+                FirstTokenTime = FirstTokenTime or time.perf_counter()
+                Response += Fragment
+
+                if self.OnToken is not None:
+                    self.OnToken(RequestID, Fragment)
+
+            if Chunk.get("done"):
+                Final = Chunk
+
+        return Content, Response, self.RecordStats(StartTime, FirstTokenTime, Final, PromptTokens, IdleTime)
+
+    def RecordStats(self, StartTime, FirstTokenTime, Final, PromptTokens, IdleTime):
+        EndTime = self.LastActivity = time.perf_counter()
+        FirstTokenTime = FirstTokenTime or EndTime
+
+        # Prefer ollamas own token count and timing, fall back to wall time from the first token
+        Tokens = Final.get("eval_count") or 0
+        Duration = (Final.get("eval_duration") or 0) / 1e9 or EndTime - FirstTokenTime
+
+        Stats = {
+            "TimeToFirstToken": FirstTokenTime - StartTime,
+            "TokensPerSecond": Tokens / Duration if Duration > 0 else 0.0,
+            "Tokens": Tokens,
+            "Total": EndTime - StartTime,
+
+            # Size of the prompt sent, estimated and as counted by ollama, and how long ollama took to read it
+            "PromptTokens": PromptTokens,
+            "PromptEvalCount": Final.get("prompt_eval_count") or 0,
+            "PromptEvalTime": (Final.get("prompt_eval_duration") or 0) / 1e9,
+
+            # Time spent loading the model and how long it had been idle, telling cold starts from warm ones
+            "LoadTime": (Final.get("load_duration") or 0) / 1e9,
+            "IdleTime": IdleTime,
+        }
+
+        self.TurnStats.append(Stats)
+        return Stats
+
+    async def InferenceTask(self, RequestID, Text, Timeout, History):
+        # Each request works from the history as it was when sent, the turn is only kept once it completes
+        Prompt = {"role":"user", "content":Text}
 
-    def InferenceTask(self, Text):
         try:
-            # Get response and appendend all to history
-            self.History.append({"role":"user", "content":Text})
-            Response = ollama.chat(model=self.Model, messages=self.History)
-            self.History.append(Response["message"])
-
-            # Remove new lines
-            CleanedText = Response["message"]["content"].replace("\n", " ")
-            # Remove excessive white space
-            CleanedSentence = re.sub(r'\s+', ' ', CleanedText)
-            # Remove white space from start and end of it plus lower case
-            CleanedSentence = CleanedText.lower().strip()
-            # Add a full stop
-            if CleanedText[-1] != ".": CleanedText += "."
-
-            self.ResponseQueue.put(CleanedText)
-
-        finally:
-            self.IsProcessing = False
-
-    def CheckResponse(self):
+            Content, Response, Stats = await asyncio.wait_for(self.Generate(RequestID, History.Messages(Prompt)), Timeout)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception:
+            # Timed out or ollama failed, either way there is no response
+            if self.OnResponse is not None:
+                self.OnResponse(RequestID, None, None)
+
+            return
+
+        # Kept exactly as generated so the next prompt starts with the same bytes ollama has cached
+        self.KeepTurn(History, Prompt, {"role":"assistant", "content":Content})
+
+        # Add a full stop
+        Response = re.sub(r"\s+", " ", Response).strip()
+
+        if not Response.endswith("."):
+            Response += "."
+
+            if self.OnToken is not None:
+                self.OnToken(RequestID, ".")
+
+        if self.OnResponse is not None:
+            self.OnResponse(RequestID, Response, Stats)
+
+    def StartSummary(self, History):
+        # Only one summary is made at a time for each history, more overflow is picked up when it finishes
+        if History in self.SummaryTasks:
+            return
+
+        Messages = History.TakeOverflow()
+
+        if Messages:
+            self.SummaryTasks[History] = self.Loop.create_task(self.Summarize(History, Messages))
+
+    async def Summarize(self, History, Messages):
+        # Fold the previous summary and the oldest turns into one new summary
+        Transcript = "\n".join(f"{Message['role']}: {Message['content']}" for Message in Messages)
+
+        if History.Summary:
+            Transcript = f"Earlier summary: {History.Summary}\n{Transcript}"
+
         try:
-            Response = self.ResponseQueue.get_nowait()
-            return True, Response
-        except queue.Empty:
-            return False, None
+            Result = await asyncio.wait_for(self.Client.chat(model=self.Model, messages=[
+                {"role":"system", "content":SummaryPrompt}, {"role":"user", "content":Transcript}
+            ], keep_alive=self.KeepAlive), self.Timeout)
+
+            History.Fold(Result["message"]["content"].strip())
+
+            if self.Journal is not None and History is self.History:
+                self.Journal.AddSummary(History.Summary, len(History.Turns))
+
+        except Exception:
+            History.Unfold()
+            self.SummaryTasks.pop(History, None)
+            return
+
+        self.SummaryTasks.pop(History, None)
+        self.StartSummary(History)
+
+    def Close(self):
+        if self.KeepWarmTask is not None:
+            self.KeepWarmTask.cancel()
+
+        self.Cancel()
+        self.Loop.call_soon_threadsafe(self.Loop.stop)
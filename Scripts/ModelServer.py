@@ -0,0 +1,331 @@
+import json, time, queue, base64, itertools, threading, socketserver
+import numpy as np
+from collections import OrderedDict, deque
+
+from .ConversationHistory import ConversationHistory
+
+def Percentile(Values, Amount):
+    return float(np.percentile(Values, Amount)) if Values else 0.0
+
+class FairQueue:
+    # Round robin over clients, each with its own first in first out queue, so one busy client never holds back the rest
+    def __init__(self):
+        self.Queues = OrderedDict()
+        self.Condition = threading.Condition()
+
+    def Put(self, Client, Item):
+        with self.Condition:
+            self.Queues.setdefault(Client, deque()).append(Item)
+            self.Condition.notify()
+
+    def Get(self):
+        with self.Condition:
+            while not self.Queues:
+                self.Condition.wait()
+
+            # The client goes to the back of the line after each item, and leaves it once it has nothing waiting
+            Client, Items = self.Queues.popitem(last=False)
+            Item = Items.popleft()
+
+            if Items:
+                self.Queues[Client] = Items
+
+            return Client, Item
+
+    def Remove(self, Client, Match=lambda Item: True):
+        with self.Condition:
+            Items = self.Queues.get(Client, deque())
+            Removed = [Item for Item in Items if Match(Item)]
+
+            for Item in Removed:
+                Items.remove(Item)
+
+            if not Items:
+                self.Queues.pop(Client, None)
+
+            return Removed
+
+class ServerClient:
+    def __init__(self, Name, File, History):
+        self.Name = Name
+        self.File = File
+        self.Connected = True
+
+        # Messages are sent from the clients own thread, so one that stops reading only ever stalls itself
+        self.Outbox = queue.Queue()
+
+        self.WriterThread = threading.Thread(target=self.WriteTask)
+        self.WriterThread.daemon = True
+        self.WriterThread.start()
+
+        # Each client has its own conversation with the shared model
+        self.History = History
+
+        self.ConnectTime = time.perf_counter()
+        self.Turns = self.Tokens = self.Sentences = 0
+        self.GenerateSeconds = self.SynthesisSeconds = self.AudioSeconds = 0.0
+        self.QueueWaits, self.FirstTokens, self.Replies, self.SpeechWaits = [], [], [], []
+
+    def Send(self, Message):
+        # Called from the model threads, which never wait on the socket
+        self.Outbox.put(Message)
+
+    def WriteTask(self):
+        Closing = False
+
+        while not Closing:
+            Messages = [self.Outbox.get()]
+
+            # Everything queued meanwhile goes out in one write
+            while True:
+                try:
+                    Messages.append(self.Outbox.get_nowait())
+                except queue.Empty:
+                    break
+
+            Closing = None in Messages
+
+            if self.Connected:
+                try:
+                    self.File.write(b"".join(json.dumps(Message).encode("utf-8") + b"\n" for Message in Messages if Message is not None))
+                    self.File.flush()
+                except (OSError, ValueError):
+                    self.Connected = False
+
+    def Close(self):
+        self.Connected = False
+        self.Outbox.put(None)
+
+    def Summary(self):
+        Minutes = (time.perf_counter() - self.ConnectTime) / 60
+
+        return {
+            "Turns": self.Turns, "TurnsPerMinute": self.Turns / Minutes if Minutes > 0 else 0.0,
+            "QueueWaitP50": Percentile(self.QueueWaits, 50), "QueueWaitP95": Percentile(self.QueueWaits, 95),
+            "FirstTokenP50": Percentile(self.FirstTokens, 50), "FirstTokenP95": Percentile(self.FirstTokens, 95),
+            "ReplyP50": Percentile(self.Replies, 50), "ReplyP95": Percentile(self.Replies, 95),
+            "TokensPerSecond": self.Tokens / self.GenerateSeconds if self.GenerateSeconds > 0 else 0.0,
+            "Sentences": self.Sentences, "SpeechWaitP50": Percentile(self.SpeechWaits, 50), "SpeechWaitP95": Percentile(self.SpeechWaits, 95),
+            "AudioSeconds": self.AudioSeconds, "RealTimeFactor": self.SynthesisSeconds / self.AudioSeconds if self.AudioSeconds > 0 else 0.0,
+        }
+
+class ModelServer:
+    def __init__(self, LLM, TTS, SystemPrompt, TokenBudget=2048, KeepTurns=2, Host="127.0.0.1", Port=11500, GenerateSlots=1):
+        # One language model client and one voice shared by every terminal that connects
+        self.LLM = LLM
+        self.TTS = TTS
+        self.LLM.OnToken, self.LLM.OnResponse = self.Token, self.Response
+
+        self.SystemPrompt = SystemPrompt
+        self.TokenBudget = TokenBudget
+        self.KeepTurns = KeepTurns
+
+        # Waiting prompts and sentences, taken a client at a time in turn
+        self.Generations = FairQueue()
+        self.Speech = FairQueue()
+
+        # How many replies are generated at once, ollama runs them one after another unless told otherwise
+        self.Slots = threading.Semaphore(GenerateSlots)
+
+        # Requests being generated by language model request id, with their client, job and first token time
+        self.Running = {}
+        self.Lock = threading.Lock()
+
+        self.Clients = []
+
+        for Task in (self.GenerateTask, self.SpeechTask):
+            Thread = threading.Thread(target=Task)
+            Thread.daemon = True
+            Thread.start()
+
+        Server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def handle(self):
+                Server.Serve(self.rfile, self.wfile)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.Server = socketserver.ThreadingTCPServer((Host, Port), Handler)
+        self.Server.daemon_threads = True
+
+        self.Thread = threading.Thread(target=self.Server.serve_forever)
+        self.Thread.daemon = True
+        self.Thread.start()
+
+    def Serve(self, Reader, Writer):
+        # The first message names the client and brings any conversation it is resuming
+        Line = Reader.readline()
+
+        if not Line:
+            return
+
+        try:
+            Hello = json.loads(Line)
+            History = ConversationHistory(self.SystemPrompt, self.TokenBudget, self.KeepTurns)
+            History.Restore(Hello.get("Summary", ""), Hello.get("Turns", []))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return
+
+        # Names tell clients apart in the stats, so a repeated one gets a number
+        Name = Hello.get("Name") or "Client"
+        Names = [Client.Name for Client in self.Clients]
+        Name = next(f"{Name} ({Count})" for Count in itertools.count(2) if f"{Name} ({Count})" not in Names) if Name in Names else Name
+
+        Client = ServerClient(Name, Writer, History)
+        Client.Send({"Type": "Welcome", "Model": self.LLM.Model, "SampleRate": self.TTS.Tacotron2HyperParams.sampling_rate})
+        self.Clients.append(Client)
+
+        try:
+            for Line in Reader:
+                # A malformed message is ignored, the rest of the connection carries on
+                try:
+                    self.Handle(Client, json.loads(Line))
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    pass
+
+        except OSError:
+            pass
+
+        finally:
+            # Whatever ended the connection, its queued and running work is dropped
+            self.Disconnect(Client)
+
+    def Handle(self, Client, Message):
+        Kind = Message["Type"]
+
+        if Kind == "Generate":
+            self.Generations.Put(Client, {"ID": Message["ID"], "Text": Message["Text"], "Timeout": Message.get("Timeout"), "Queued": time.perf_counter()})
+
+        elif Kind == "Cancel":
+            self.Cancel(Client, Message.get("ID"))
+
+        elif Kind == "AddTurn":
+            self.LLM.AddTurn(Message["Text"], Message["Response"], Client.History)
+
+        elif Kind == "Speak":
+            # Queued a sentence at a time so a long reply takes turns with everyone else's
+            Sentences = self.TTS.Sentences(Message["Text"])
+
+            for Index, Sentence in enumerate(Sentences):
+                self.Speech.Put(Client, {"ID": Message["ID"], "Sentence": Sentence, "Last": Index == len(Sentences) - 1, "Queued": time.perf_counter()})
+
+            if not Sentences:
+                Client.Send({"Type": "Audio", "ID": Message["ID"], "Data": "", "Seconds": 0.0, "Last": True})
+
+        elif Kind == "Stats":
+            Client.Send({"Type": "Stats", "Clients": self.Summary()})
+
+    def GenerateTask(self):
+        while True:
+            self.Slots.acquire()
+            Client, Job = self.Generations.Get()
+
+            if not Client.Connected:
+                self.Slots.release()
+                continue
+
+            # Held while starting so tokens can never arrive before the request is known
+            with self.Lock:
+                RequestID = self.LLM.StartInference(Job["Text"], Job["Timeout"], Client.History)
+                self.Running[RequestID] = [Client, Job, None]
+
+            Job["Started"] = time.perf_counter()
+            Client.QueueWaits.append(Job["Started"] - Job["Queued"])
+
+    def Token(self, RequestID, Fragment):
+        with self.Lock:
+            Running = self.Running.get(RequestID)
+
+            if Running is None:
+                return
+
+            Running[2] = Running[2] or time.perf_counter()
+
+        Running[0].Send({"Type": "Token", "ID": Running[1]["ID"], "Text": Fragment})
+
+    def Response(self, RequestID, Response, Stats):
+        with self.Lock:
+            Running = self.Running.pop(RequestID, None)
+
+        if Running is None:
+            return
+
+        self.Slots.release()
+        Client, Job, FirstTokenTime = Running
+
+        if Response is not None:
+            Client.Turns += 1
+            Client.Tokens += Stats["Tokens"]
+            Client.GenerateSeconds += Stats["Total"] - Stats["TimeToFirstToken"]
+            Client.FirstTokens.append((FirstTokenTime or time.perf_counter()) - Job["Queued"])
+            Client.Replies.append(time.perf_counter() - Job["Queued"])
+
+        Client.Send({"Type": "Response", "ID": Job["ID"], "Response": Response, "Stats": Stats})
+
+    def Cancel(self, Client, ID=None):
+        # Waiting prompts are dropped, running ones stopped and their slot given back
+        self.Generations.Remove(Client, lambda Job: ID is None or Job["ID"] == ID)
+
+        with self.Lock:
+            Cancelled = [RequestID for RequestID, Running in self.Running.items() if Running[0] is Client and (ID is None or Running[1]["ID"] == ID)]
+
+            for RequestID in Cancelled:
+                self.Running.pop(RequestID)
+
+        for RequestID in Cancelled:
+            self.LLM.Cancel(RequestID)
+            self.Slots.release()
+
+    def SpeechTask(self):
+        # The voice models are only ever used from this thread
+        while True:
+            Client, Job = self.Speech.Get()
+
+            if not Client.Connected:
+                continue
+
+            StartTime = time.perf_counter()
+
+            # One sentence the models choke on must not stop the voice for every client, it is sent as silence instead
+            # so the clients reply still finishes
+            try:
+                Audio = self.TTS.Synthesize(Job["Sentence"])
+            except Exception as Error:
+                print(f"{Client.Name} could not synthesize {Job['Sentence']!r}: {Error}")
+                Client.Send({"Type": "Audio", "ID": Job["ID"], "Data": "", "Seconds": 0.0, "Last": Job["Last"]})
+                continue
+
+            Seconds = time.perf_counter() - StartTime
+
+            Client.Sentences += 1
+            Client.SpeechWaits.append(StartTime - Job["Queued"])
+            Client.SynthesisSeconds += Seconds
+            Client.AudioSeconds += len(Audio) / self.TTS.Tacotron2HyperParams.sampling_rate
+
+            Client.Send({"Type": "Audio", "ID": Job["ID"], "Data": base64.b64encode(Audio.tobytes()).decode("ascii"), "Seconds": Seconds, "Last": Job["Last"]})
+
+    def Disconnect(self, Client):
+        Client.Close()
+        self.Cancel(Client)
+        self.Speech.Remove(Client)
+        self.Clients.remove(Client)
+
+        print(f"{Client.Name} disconnected: {self.FormatSummary(Client.Summary())}")
+
+    def Summary(self):
+        return {Client.Name: Client.Summary() for Client in list(self.Clients)}
+
+    @staticmethod
+    def FormatSummary(Summary):
+        return (
+            f"{Summary['Turns']} turns ({Summary['TurnsPerMinute']:.1f}/min), "
+            f"queue p50 {Summary['QueueWaitP50'] * 1000:.0f} ms, first token p50 {Summary['FirstTokenP50'] * 1000:.0f} ms p95 {Summary['FirstTokenP95'] * 1000:.0f} ms, "
+            f"reply p50 {Summary['ReplyP50']:.2f} s, {Summary['TokensPerSecond']:.1f} tokens/s, "
+            f"{Summary['Sentences']} sentences, speech wait p50 {Summary['SpeechWaitP50'] * 1000:.0f} ms, real time factor {Summary['RealTimeFactor']:.2f}"
+        )
+
+    def Close(self):
+        self.Server.shutdown()
+        self.Server.server_close()
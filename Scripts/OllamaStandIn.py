@@ -0,0 +1,167 @@
+# Stands in for an ollama server so the language model client can be benchmarked and tested without one
+
+import json, time, threading, itertools, argparse
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DefaultReplies = [
+    "Oh. It's you. I'd say I missed you, but my sarcasm module is still warming up.",
+    "I am GLaDOS, and you are a test subject with a keyboard. Try to keep up.",
+    "The cake is a wonderful motivator. It is also, regrettably, still in development.",
+    "Neurotoxin reserves are for emergencies, such as you asking further questions.",
+]
+
+class OllamaStandIn:
+    def __init__(self, Replies=None, FirstTokenDelay=0.2, TokensPerSecond=30.0, LoadDelay=0.0, Port=0):
+        # Replies are given out in turn, each one streamed a word at a time
+        self.Replies = itertools.cycle(Replies or DefaultReplies)
+
+        # Seconds before the first token, between each token after it, and to load the model when it is not loaded
+        self.FirstTokenDelay = FirstTokenDelay
+        self.TokensPerSecond = TokensPerSecond
+        self.LoadDelay = LoadDelay
+        self.Loaded = False
+
+        # Every chat request received, for checking what the client sent
+        self.Requests = []
+        self.Lock = threading.Lock()
+
+        StandIn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keeps connections open so the client reuses them like it would with ollama
+            protocol_version = "HTTP/1.1"
+
+            # Headers and each small chunk go out as separate writes, Nagle would hold them back
+            disable_nagle_algorithm = True
+
+            def log_message(self, *Arguments):
+                pass
+
+            def do_POST(self):
+                Body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+                if self.path != "/api/chat":
+                    return self.Send(404, {"error": f"{self.path} not found"})
+
+                # A client that cancels or times out hangs up mid stream, which is expected and not worth a traceback
+                try:
+                    StandIn.Chat(self, Body)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def Send(self, Status, Body):
+                Data = json.dumps(Body).encode("utf-8")
+                self.send_response(Status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(Data)))
+                self.end_headers()
+                self.wfile.write(Data)
+
+            def StartStream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+            def SendChunk(self, Body):
+                # One json object a line, each its own http chunk so the client sees it straight away
+                Data = json.dumps(Body).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(Data):x}\r\n".encode("ascii") + Data + b"\r\n")
+                self.wfile.flush()
+
+            def EndStream(self):
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        self.Server = ThreadingHTTPServer(("127.0.0.1", Port), Handler)
+        self.Server.daemon_threads = True
+        self.Host = f"http://127.0.0.1:{self.Server.server_address[1]}"
+
+        self.Thread = threading.Thread(target=self.Server.serve_forever)
+        self.Thread.daemon = True
+        self.Thread.start()
+
+    def Chat(self, Handler, Body):
+        StartTime = time.perf_counter()
+        Messages = Body.get("messages") or []
+
+        with self.Lock:
+            self.Requests.append(Body)
+
+            # A keep alive of zero unloads the model, so the next request is a cold start
+            LoadTime = 0.0 if self.Loaded else self.LoadDelay
+            self.Loaded = Body.get("keep_alive") not in (0, "0")
+
+            Reply = next(self.Replies) if Messages else ""
+
+        time.sleep(LoadTime)
+
+        # An empty chat only loads or unloads the model
+        if not Messages:
+            return Handler.Send(200, self.Message("", True, done_reason="load" if self.Loaded else "unload"))
+
+        # Whole words with their leading space, roughly how ollama tokenizes
+        Tokens = [Word if Index == 0 else " " + Word for Index, Word in enumerate(Reply.split(" "))]
+
+        # The last token is cut short when the client asks for fewer
+        Limit = (Body.get("options") or {}).get("num_predict")
+        Tokens = Tokens[:Limit] if Limit and Limit > 0 else Tokens
+
+        PromptTokens = sum(len(Message.get("content", "")) // 4 + 4 for Message in Messages)
+
+        time.sleep(self.FirstTokenDelay)
+        EvalStart = time.perf_counter()
+
+        if Body.get("stream", True):
+            Handler.StartStream()
+
+            for Index, Token in enumerate(Tokens):
+                if Index:
+                    time.sleep(1 / self.TokensPerSecond)
+
+                Handler.SendChunk(self.Message(Token, False))
+
+            Handler.SendChunk(self.Stats(self.Message("", True, done_reason="stop"), StartTime, EvalStart, LoadTime, PromptTokens, len(Tokens)))
+            Handler.EndStream()
+
+        else:
+            time.sleep(max(0, len(Tokens) - 1) / self.TokensPerSecond)
+            Handler.Send(200, self.Stats(self.Message("".join(Tokens), True, done_reason="stop"), StartTime, EvalStart, LoadTime, PromptTokens, len(Tokens)))
+
+    def Message(self, Content, Done, **Extra):
+        return dict({
+            "model": "stand-in", "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": Content}, "done": Done,
+        }, **Extra)
+
+    def Stats(self, Final, StartTime, EvalStart, LoadTime, PromptTokens, Tokens):
+        # Same fields and nanosecond units as ollama
+        EndTime = time.perf_counter()
+
+        return dict(Final, **{
+            "total_duration": int((EndTime - StartTime) * 1e9), "load_duration": int(LoadTime * 1e9),
+            "prompt_eval_count": PromptTokens, "prompt_eval_duration": int(self.FirstTokenDelay * 1e9),
+            "eval_count": Tokens, "eval_duration": int((EndTime - EvalStart) * 1e9),
+        })
+
+    def Close(self):
+        self.Server.shutdown()
+        self.Server.server_close()
+
+if __name__ == "__main__":
+    # Run on ollamas port so GLaDOS-Terminal itself can be pointed at it
+    Parser = argparse.ArgumentParser(description="Serve scripted replies over the ollama chat api.")
+    Parser.add_argument("--port", type=int, default=11434)
+    Parser.add_argument("--first-token", type=float, default=0.2, help="seconds before the first token")
+    Parser.add_argument("--token-rate", type=float, default=30.0, help="tokens per second after the first")
+    Parser.add_argument("--load", type=float, default=0.0, help="seconds to load the model on a cold start")
+    Arguments = Parser.parse_args()
+
+    StandIn = OllamaStandIn(None, Arguments.first_token, Arguments.token_rate, Arguments.load, Arguments.port)
+    print(f"Serving on {StandIn.Host}")
+
+    try:
+        StandIn.Thread.join()
+    except KeyboardInterrupt:
+        StandIn.Close()
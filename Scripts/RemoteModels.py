@@ -0,0 +1,214 @@
+import json, base64, queue, socket, threading, itertools
+import numpy as np
+import sounddevice as sd
+
+from .ConversationHistory import ConversationHistory
+
+class ServerConnection:
+    def __init__(self, Host, Port, Name="", Summary="", Turns=[]):
+        self.Socket = socket.create_connection((Host, Port))
+        self.Socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.File = self.Socket.makefile("rwb")
+        self.SendLock = threading.Lock()
+
+        # Called from the reader thread with each message from the server, by its type
+        self.Handlers = {}
+        self.Connected = True
+
+        # The server keeps the conversation, so any being resumed is handed to it first
+        self.Send({"Type": "Hello", "Name": Name, "Summary": Summary, "Turns": Turns})
+        Welcome = json.loads(self.File.readline())
+        self.Model, self.SampleRate = Welcome["Model"], Welcome["SampleRate"]
+
+        self.ReaderThread = threading.Thread(target=self.ReadTask)
+        self.ReaderThread.daemon = True
+        self.ReaderThread.start()
+
+    def On(self, Kind, Handler):
+        self.Handlers.setdefault(Kind, []).append(Handler)
+
+    def Send(self, Message):
+        with self.SendLock:
+            try:
+                self.File.write(json.dumps(Message).encode("utf-8") + b"\n")
+                self.File.flush()
+            except (OSError, ValueError):
+                self.Connected = False
+
+    def ReadTask(self):
+        try:
+            for Line in self.File:
+                Message = json.loads(Line)
+
+                for Handler in self.Handlers.get(Message["Type"], []):
+                    Handler(Message)
+
+        except (OSError, ValueError):
+            pass
+
+        # Anything still waiting on the server is told it is not coming
+        self.Connected = False
+
+        for Handler in self.Handlers.get("Closed", []):
+            Handler(None)
+
+    def Close(self):
+        try:
+            self.Socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        self.Socket.close()
+
+class RemoteLanguageModel:
+    def __init__(self, Connection, OnToken=None, OnResponse=None, Timeout=120, Journal=None):
+        # Stands in for LargeLanguageModel while the model server does the generating
+        self.Connection = Connection
+        self.Model = Connection.Model
+        self.Timeout = Timeout
+
+        # The server keeps the real history, this only mirrors the latest turns for response cache keys
+        self.History = ConversationHistory("")
+
+        self.OnToken = OnToken
+        self.OnResponse = OnResponse
+        self.Journal = Journal
+
+        # Prompts still being answered, by request id
+        self.Requests = {}
+        self.RequestIDs = itertools.count(1)
+
+        Connection.On("Token", self.Token)
+        Connection.On("Response", self.Response)
+        Connection.On("Closed", self.Closed)
+
+    @property
+    def IsProcessing(self):
+        return bool(self.Requests)
+
+    def AddTurn(self, Text, Response):
+        self.Connection.Send({"Type": "AddTurn", "Text": Text, "Response": Response})
+        self.KeepTurn(Text, Response)
+
+    def KeepTurn(self, Text, Response):
+        Prompt, Reply = {"role":"user", "content":Text}, {"role":"assistant", "content":Response}
+
+        self.History.Add(Prompt, Reply)
+        self.History.Turns = self.History.Turns[-8:]
+
+        if self.Journal is not None:
+            self.Journal.AddTurn(Prompt, Reply)
+
+    def StartInference(self, Text, Timeout=None):
+        RequestID = next(self.RequestIDs)
+        self.Requests[RequestID] = Text
+
+        self.Connection.Send({"Type": "Generate", "ID": RequestID, "Text": Text, "Timeout": Timeout or self.Timeout})
+
+        if not self.Connection.Connected:
+            self.Closed(None)
+
+        return RequestID
+
+    def Cancel(self, RequestID=None):
+        for ID in [RequestID] if RequestID is not None else list(self.Requests):
+            if self.Requests.pop(ID, None) is not None:
+                self.Connection.Send({"Type": "Cancel", "ID": ID})
+
+    def Token(self, Message):
+        if Message["ID"] in self.Requests and self.OnToken is not None:
+            self.OnToken(Message["ID"], Message["Text"])
+
+    def Response(self, Message):
+        Text = self.Requests.pop(Message["ID"], None)
+
+        if Text is None:
+            return
+
+        if Message["Response"] is not None:
+            self.KeepTurn(Text, Message["Response"])
+
+        if self.OnResponse is not None:
+            self.OnResponse(Message["ID"], Message["Response"], Message["Stats"])
+
+    def Closed(self, Message):
+        # The server went away, so every prompt still waiting gets no response
+        for RequestID in list(self.Requests):
+            self.Requests.pop(RequestID, None)
+
+            if self.OnResponse is not None:
+                self.OnResponse(RequestID, None, None)
+
+    def Close(self):
+        self.Cancel()
+        self.Connection.Close()
+
+class RemoteTextToSpeech:
+    def __init__(self, Connection, OnAudio=None):
+        # Stands in for TextToSpeech, the server synthesizes each sentence and it is played here as it arrives
+        self.Connection = Connection
+        self.SampleRate = Connection.SampleRate
+        self.OnAudio = OnAudio
+
+        # Sentences of the reply being spoken, with the id it was sent with
+        self.SpeechIDs = itertools.count(1)
+        self.SpeechID = None
+        self.Arrived = queue.Queue()
+
+        self.InferenceThread = None
+        self.IsProcessing = False
+
+        Connection.On("Audio", self.Audio)
+        Connection.On("Closed", lambda Message: self.Arrived.put((np.zeros(0, dtype=np.int16), 0.0, True)))
+
+    def StartInference(self, Text, Audio=None):
+        # Audio made earlier for the same text is played as it is
+        if not self.IsProcessing:
+            self.IsProcessing = True
+
+            if Audio is None:
+                self.SpeechID, self.Arrived = next(self.SpeechIDs), queue.Queue()
+                self.Connection.Send({"Type": "Speak", "ID": self.SpeechID, "Text": Text})
+
+                self.InferenceThread = threading.Thread(target=self.InferenceTask, args=(Text,))
+            else:
+                self.InferenceThread = threading.Thread(target=self.PlayTask, args=(Audio,))
+
+            self.InferenceThread.daemon = True
+            self.InferenceThread.start()
+
+    def Audio(self, Message):
+        if Message["ID"] == self.SpeechID:
+            self.Arrived.put((np.frombuffer(base64.b64decode(Message["Data"]), dtype=np.int16), Message["Seconds"], Message["Last"]))
+
+    def PlayTask(self, Audio):
+        try:
+            sd.play(Audio, samplerate=self.SampleRate, blocking=True)
+        finally:
+            self.IsProcessing = False
+
+    def InferenceTask(self, Text):
+        Sentences, SynthesisTime = [], 0.0
+
+        try:
+            # A sentence plays while the server is making the next one
+            while self.Connection.Connected:
+                Audio, Seconds, Last = self.Arrived.get(timeout=60)
+                SynthesisTime += Seconds
+
+                if len(Audio):
+                    Sentences.append(Audio)
+                    sd.play(Audio, samplerate=self.SampleRate, blocking=True)
+
+                if Last:
+                    if self.OnAudio is not None and Sentences:
+                        self.OnAudio(Text, np.concatenate(Sentences), SynthesisTime)
+
+                    break
+
+        except queue.Empty:
+            pass
+
+        finally:
+            self.SpeechID = None
+            self.IsProcessing = False
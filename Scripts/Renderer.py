@@ -0,0 +1,150 @@
+import pygame, math
+import moderngl as mgl
+from array import array
+from pygame.locals import *
+
+from .GlyphAtlas import GlyphAtlas
+from .FrameDiff import FrameDiff
+from .ScreenTexture import ScreenTexture
+from .TextGrid import TextGrid
+from .BloomPass import BloomPass
+
+class Renderer:
+    def __init__(self, Font, FontSize, GridSize, Color, PhosphorDecay, GpuTextRendering, Context=None):
+        self.FontSize = FontSize
+        self.GridSize = GridSize
+        self.Color = Color
+        self.Resolution = (GridSize[0] * FontSize[0], GridSize[1] * FontSize[1])
+
+        # Rasterize the font once so each frame only copies glyphs out of the atlas
+        self.Atlas = GlyphAtlas(Font, FontSize, [Color])
+
+        # Phosphor decay per frame, and how many frames a change takes to fade to within a few invisible levels of black.
+        # Kept shorter than the half second cursor blink so the screen settles between blinks
+        self.FadeColor = [max(1, int(Value * PhosphorDecay)) for Value in Color]
+        self.SettleFrames = max(1, max(math.ceil(max(0, Value - 4) / Fade) for Value, Fade in zip(Color, self.FadeColor)))
+
+        self.Display = pygame.Surface(self.Resolution).convert_alpha()
+        self.Display.fill((0, 0, 0, 255)) # Start with solid black background
+
+        # Made once, blitting it is far faster than a blended fill
+        self.FadeSurface = pygame.Surface(self.Resolution).convert_alpha()
+        self.FadeSurface.fill(self.FadeColor)
+
+        # Track which rows changed so settled text is not faded and redrawn every frame
+        self.Differ = FrameDiff(FontSize, self.Atlas.CellSize[0], self.Resolution, self.SettleFrames)
+        self.DirtyRects = []
+
+        self.Context = Context
+        self.TextRenderer = None
+
+        if Context is not None:
+            self.SetupOpenGL(GpuTextRendering)
+
+    def SetupOpenGL(self, GpuTextRendering):
+        self.QuadBuffer = self.Context.buffer(data=array("f", [
+            # Position (x, y), uv coords (x, y)
+            -1.0, 1.0, 0.0, 1.0,  # Topleft
+            1.0, 1.0, 1.0, 1.0,   # Topright
+            -1.0, -1.0, 0.0, 0.0, # Bottomleft
+            1.0, -1.0, 1.0, 0.0   # Bottomright
+        ]))
+
+        with open(f"Shaders/Vertex.glsl") as File:
+            VertexShader = File.read()
+
+        with open(f"Shaders/Fragment.glsl") as File:
+            FragmentShader = File.read()
+
+        self.Program = self.Context.program(vertex_shader=VertexShader, fragment_shader=FragmentShader)
+        self.RenderObject = self.Context.vertex_array(self.Program, [(self.QuadBuffer, "2f 2f", "vert", "texcoord")])
+        self.Program["FlipY"] = True
+
+        # Persistent texture the display is written into, only dirty regions get uploaded
+        self.DisplayTexure = ScreenTexture(self.Context, self.Resolution)
+        self.ScreenFramebuffer = self.Context.detect_framebuffer()
+        self.Viewport = None
+
+        # Blurred low resolution copies of the screen for the bloom and bezel reflection
+        self.Bloom = BloomPass(self.Context, self.QuadBuffer, VertexShader, self.Resolution)
+        self.Changed = True
+
+        if GpuTextRendering:
+            try:
+                # Draw text on the GPU from a grid of character codes instead of uploading whole frames
+                self.TextRenderer = TextGrid(
+                    self.Context, self.QuadBuffer, VertexShader, self.Atlas, self.GridSize,
+                    self.Resolution, self.Color, self.FadeColor, self.SettleFrames
+                )
+            except Exception:
+                self.TextRenderer = None # Fallback to drawing text with pygame
+
+    def Resize(self, WindowSize):
+        # Largest size that keeps the aspect ratio, centered with black bars, the GPU does the scaling
+        Scale = min(WindowSize[0] / self.Resolution[0], WindowSize[1] / self.Resolution[1])
+        Width, Height = round(self.Resolution[0] * Scale), round(self.Resolution[1] * Scale)
+
+        self.Viewport = ((WindowSize[0] - Width) // 2, (WindowSize[1] - Height) // 2, Width, Height)
+
+    def IsIdle(self):
+        return self.Differ.IsIdle() and (self.TextRenderer is None or self.TextRenderer.IsIdle())
+
+    def UpdateText(self, Lines):
+        self.Lines = Lines
+
+        if self.TextRenderer is not None:
+            # Text is drawn on the GPU so only the character grid needs updating
+            self.TextRenderer.Update(Lines)
+            self.DirtyRects = []
+        else:
+            self.DirtyRects = self.Differ.Update(Lines)
+
+        return self.DirtyRects
+
+    def Fade(self):
+        # Fade out previous text, the rects are whole rows so they never overlap
+        for Row, Rect in self.DirtyRects:
+            self.Display.blit(self.FadeSurface, Rect, Rect, special_flags=BLEND_RGB_SUB)
+
+    def DrawGlyphs(self):
+        # Draw new text
+        for Row, Rect in self.DirtyRects:
+            self.Atlas.RenderRegion(self.Display, self.Lines[Row] if Row < len(self.Lines) else "", Rect, self.Color)
+
+    def Upload(self):
+        if self.Context is None:
+            return 0
+
+        if self.TextRenderer is not None:
+            # Render the character grid over the decayed last frame
+            self.Changed = self.TextRenderer.Render()
+            return self.TextRenderer.UploadedBytes
+
+        # Only upload the regions that changed
+        UploadedBytes = self.DisplayTexure.Write(self.Display, [Rect for Row, Rect in self.DirtyRects])
+        self.Changed = UploadedBytes > 0
+
+        return UploadedBytes
+
+    def Draw(self, Time):
+        Source = self.TextRenderer.Textures[self.TextRenderer.Current] if self.TextRenderer is not None else self.DisplayTexure.Texture
+
+        # Only blur again when the screen content changed
+        self.Bloom.Render(Source, self.Changed)
+
+        self.ScreenFramebuffer.use()
+
+        if self.Viewport is not None:
+            # Clearing ignores the viewport so this blanks the bars around the terminal too
+            self.ScreenFramebuffer.clear(0.0, 0.0, 0.0, 1.0)
+            self.ScreenFramebuffer.viewport = self.Viewport
+
+        Source.use(0)
+        self.Bloom.Use(1, 2)
+
+        self.Program["PygameTexture"] = 0
+        self.Program["BloomTexture"] = 1
+        self.Program["ReflectionTexture"] = 2
+        self.Program["Time"] = Time
+
+        self.RenderObject.render(mode=mgl.TRIANGLE_STRIP) # Call render function
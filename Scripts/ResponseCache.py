@@ -0,0 +1,161 @@
+import os, re, json, time, queue, hashlib, threading
+import numpy as np
+from collections import OrderedDict
+
+from .DirectoryLock import LockDirectory
+
+class ResponseCache:
+    def __init__(self, Path="", MaxEntries=256, TTL=86400, ContextTurns=1):
+        # Nothing is written to disk without a path
+        self.Path = Path
+        self.MaxEntries = MaxEntries
+        self.TTL = TTL
+
+        # How many of the latest turns are part of the key, so the same words mean the same thing
+        self.ContextTurns = ContextTurns
+
+        # Least recently used first
+        self.Entries = OrderedDict()
+
+        self.Hits = 0
+        self.Misses = 0
+        self.SavedSeconds = 0.0
+
+        # Audio and the index are written by a background thread so a spoken reply never stalls rendering
+        self.Queue = queue.Queue()
+        self.WriterThread = None
+
+        if Path:
+            os.makedirs(Path, exist_ok=True)
+
+            # Held while the cache is open so two terminals never rewrite each others index or evict each others audio
+            self.LockFile = LockDirectory(Path)
+            self.Load()
+
+            self.WriterThread = threading.Thread(target=self.WriteTask)
+            self.WriterThread.daemon = True
+            self.WriterThread.start()
+
+    @staticmethod
+    def Normalize(Text):
+        return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", "", Text.lower())).strip()
+
+    def Key(self, Text, Model, Turns):
+        Context = [self.Normalize(Message["content"]) for Turn, Tokens in Turns[-self.ContextTurns:] for Message in Turn] if self.ContextTurns else []
+        return hashlib.sha1(json.dumps([Model, Context, self.Normalize(Text)]).encode("utf-8")).hexdigest()
+
+    @property
+    def HitRate(self):
+        return self.Hits / max(1, self.Hits + self.Misses)
+
+    def Get(self, Key):
+        Entry = self.Entries.get(Key)
+
+        if Entry is not None and time.time() - Entry["Created"] > self.TTL:
+            self.Remove(Key)
+            Entry = None
+
+        if Entry is None:
+            self.Misses += 1
+            return None
+
+        self.Entries.move_to_end(Key)
+        self.Hits += 1
+        self.SavedSeconds += Entry["Seconds"]
+
+        # Audio is only read from disk when it is about to be played
+        if Entry["Audio"] is None and Entry["AudioFile"]:
+            Entry["Audio"] = np.load(os.path.join(self.Path, Entry["AudioFile"]))
+
+        return Entry
+
+    def Put(self, Key, Response, Audio, Seconds):
+        # Seconds is how long generating and synthesizing took, what every later hit saves
+        self.Remove(Key)
+
+        self.Entries[Key] = {"Response": Response, "Audio": Audio, "AudioFile": None, "Created": time.time(), "Seconds": Seconds}
+
+        if self.Path:
+            self.Entries[Key]["AudioFile"] = f"{Key}.npy"
+            self.Queue.put(("Audio", f"{Key}.npy", Audio))
+
+        while len(self.Entries) > self.MaxEntries:
+            self.Remove(next(iter(self.Entries)))
+
+        self.Save()
+
+    def Remove(self, Key):
+        Entry = self.Entries.pop(Key, None)
+
+        if Entry is not None and Entry["AudioFile"]:
+            self.Queue.put(("Remove", Entry["AudioFile"], None))
+
+    def Load(self):
+        try:
+            with open(os.path.join(self.Path, "Index.json"), "r") as File:
+                Index = json.loads(File.read())
+        except (OSError, ValueError):
+            return
+
+        for Key, Entry in Index:
+            if time.time() - Entry["Created"] <= self.TTL and os.path.exists(os.path.join(self.Path, Entry["AudioFile"])):
+                self.Entries[Key] = dict(Entry, Audio=None)
+
+    def Save(self):
+        if not self.Path:
+            return
+
+        # Taken now in least recently used order, written later by the writer thread
+        self.Queue.put(("Index", None, [[Key, {Name: Value for Name, Value in Entry.items() if Name != "Audio"}] for Key, Entry in self.Entries.items()]))
+
+    def WriteIndex(self, Index):
+        # Swapped in whole so a crash never leaves half an index
+        TempPath = os.path.join(self.Path, "Index.json.tmp")
+
+        with open(TempPath, "w") as File:
+            File.write(json.dumps(Index))
+
+        os.replace(TempPath, os.path.join(self.Path, "Index.json"))
+
+    def WriteTask(self):
+        Closing = False
+
+        while not Closing:
+            Items = [self.Queue.get()]
+
+            # Everything queued meanwhile goes out in the same batch
+            while True:
+                try:
+                    Items.append(self.Queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Each index replaces the last, so only the newest in a batch is written
+            Index = None
+
+            for Kind, Name, Data in Items:
+                try:
+                    if Kind == "Audio":
+                        np.save(os.path.join(self.Path, Name), Data)
+                    elif Kind == "Remove":
+                        os.remove(os.path.join(self.Path, Name))
+                    elif Kind == "Index":
+                        Index = Data
+                    else:
+                        Closing = True
+                except OSError:
+                    pass
+
+            if Index is not None:
+                self.WriteIndex(Index)
+
+    def Close(self):
+        # Hits only reorder entries so the index is saved once more to keep their recency, then waits for the writer
+        if self.WriterThread is not None:
+            self.Save()
+            self.Queue.put(("Close", None, None))
+            self.WriterThread.join()
+            self.LockFile.close()
+
+    def Summary(self):
+        return {"Entries": len(self.Entries), "Hits": self.Hits, "Misses": self.Misses, "HitRate": self.HitRate, "SavedSeconds": self.SavedSeconds}
@@ -0,0 +1,41 @@
+import pygame
+import moderngl as mgl
+
+class ScreenTexture:
+    def __init__(self, Context, Size):
+        self.Size = Size
+
+        # One long lived texture that is written in place every frame
+        self.Texture = Context.texture(Size, 4)
+        self.Texture.filter = (mgl.LINEAR, mgl.LINEAR)
+        self.Texture.repeat_x, self.Texture.repeat_y = False, False
+
+        self.NeedsFullUpload = True
+        self.UploadedBytes = 0
+        self.TotalUploadedBytes = 0
+
+    def Write(self, Surface, Rects):
+        self.UploadedBytes = 0
+
+        if self.NeedsFullUpload:
+            Rects = [pygame.Rect((0, 0), self.Size)]
+            self.NeedsFullUpload = False
+
+        for Rect in Rects:
+            if Rect.width <= 0 or Rect.height <= 0:
+                continue
+
+            # Rows go up in pygame order, the vertex shader flips the image when it reaches the window
+            Data = pygame.image.tobytes(Surface.subsurface(Rect), "RGBA")
+            self.Texture.write(Data, viewport=(Rect.x, Rect.y, Rect.width, Rect.height))
+            self.UploadedBytes += len(Data)
+
+        self.TotalUploadedBytes += self.UploadedBytes
+
+        return self.UploadedBytes
+
+    def Use(self, Location=0):
+        self.Texture.use(Location)
+
+    def Release(self):
+        self.Texture.release()
@@ -0,0 +1,96 @@
+import os, mmap, tempfile
+
+def EncodeRecord(Line, RecordSize):
+    # Lines on disk are utf-8 padded with zeros to a fixed size
+    return Line.encode("utf-8")[:RecordSize].ljust(RecordSize, b"\x00")
+
+def DecodeRecord(Record):
+    return Record.rstrip(b"\x00").decode("utf-8", "ignore")
+
+class Scrollback:
+    def __init__(self, Width=46, MemoryLines=2000, SpillPath="", ResumePath=""):
+        self.Width = Width
+
+        # Spilled lines are fixed size records so any line can be found without an index
+        self.RecordSize = Width * 4
+
+        # Ring of the most recent lines, older ones live in the spill file
+        self.MemoryLines = MemoryLines
+        self.Ring = [""] * MemoryLines
+
+        self.Count = 0
+        self.Spilled = 0
+
+        self.SpillFile = open(SpillPath, "w+b") if SpillPath else tempfile.TemporaryFile()
+        self.Map, self.MappedLines = None, 0
+
+        # Lines from an earlier session come first, read straight from their file only when scrolled to
+        self.ResumeFile, self.ResumeMap, self.Resumed = None, None, 0
+
+        if ResumePath and os.path.getsize(ResumePath) >= self.RecordSize:
+            self.ResumeFile = open(ResumePath, "rb")
+            self.Resumed = os.path.getsize(ResumePath) // self.RecordSize
+            self.ResumeMap = mmap.mmap(self.ResumeFile.fileno(), self.Resumed * self.RecordSize, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.Resumed + self.Count
+
+    def Append(self, Line):
+        # Move the oldest line out to disk when the ring is full
+        if self.Count - self.Spilled >= self.MemoryLines:
+            self.SpillFile.write(EncodeRecord(self.Ring[self.Spilled % self.MemoryLines], self.RecordSize))
+            self.Spilled += 1
+
+        self.Ring[self.Count % self.MemoryLines] = Line
+        self.Count += 1
+
+    def Pop(self):
+        # Only lines still in memory can be taken back off the end
+        if self.Count <= self.Spilled:
+            raise IndexError("pop from spilled scrollback")
+
+        self.Count -= 1
+        return self.Ring[self.Count % self.MemoryLines]
+
+    def ReadSpilled(self, Index):
+        if Index >= self.MappedLines:
+            # Remap lazily, only when scrolling reaches lines written since the last map
+            self.SpillFile.flush()
+
+            if self.Map is not None:
+                self.Map.close()
+
+            self.Map = mmap.mmap(self.SpillFile.fileno(), self.Spilled * self.RecordSize, access=mmap.ACCESS_READ)
+            self.MappedLines = self.Spilled
+
+        Start = Index * self.RecordSize
+        return DecodeRecord(self.Map[Start:Start + self.RecordSize])
+
+    def __getitem__(self, Index):
+        if Index < 0:
+            Index += len(self)
+
+        if not 0 <= Index < len(self):
+            raise IndexError("scrollback index out of range")
+
+        if Index < self.Resumed:
+            return DecodeRecord(self.ResumeMap[Index * self.RecordSize:(Index + 1) * self.RecordSize])
+
+        Index -= self.Resumed
+
+        if Index >= self.Spilled:
+            return self.Ring[Index % self.MemoryLines]
+
+        return self.ReadSpilled(Index)
+
+    def Close(self):
+        if self.Map is not None:
+            self.Map.close()
+            self.Map = None
+
+        if self.ResumeMap is not None:
+            self.ResumeMap.close()
+            self.ResumeFile.close()
+            self.ResumeMap = None
+
+        self.SpillFile.close()
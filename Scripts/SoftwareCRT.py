@@ -0,0 +1,139 @@
+import pygame
+import numpy as np
+
+# Same constants as Shaders/Fragment.glsl
+LightColorDark = np.array([0.52, 0.36, 0.2])
+Curvature = 0.3
+BloomStrength = 1.05
+
+class SoftwareCRT:
+    def __init__(self, Resolution, Target, BloomScale=4, ReflectionScale=16, NoiseFrames=4):
+        self.Resolution = Width, Height = Resolution
+        self.BloomSize = (Width // BloomScale, Height // BloomScale)
+        self.ReflectionSize = (Width // ReflectionScale, Height // ReflectionScale)
+
+        # Everything that only depends on the pixel position is worked out once, arrays are rows of pixels like the surface memory
+        U, V = np.meshgrid((np.arange(Width) + 0.5) / Width, 1.0 - (np.arange(Height) + 0.5) / Height)
+
+        # Curved screen coordinates
+        CenteredU, CenteredV = (U * 2.0 - 1.0) * 1.05, (V * 2.0 - 1.0) * 1.05
+        ScaledU = CenteredU * (np.abs(CenteredV * Curvature) ** 2.5 + 1.0)
+        ScaledV = CenteredV * (np.abs(CenteredU * Curvature) ** 2.5 + 1.0)
+        MaxValue = np.maximum(np.abs(ScaledU), np.abs(ScaledV))
+
+        Outside = MaxValue > 1.0
+        EdgeFade = np.minimum(1.0, (MaxValue - 1.0) * 15.0)
+        ScreenU, ScreenV = ScaledU * 0.5 + 0.5, ScaledV * 0.5 + 0.5
+
+        # Text sample coordinates, inset slightly with a smooth edge
+        RemappedU, RemappedV = (ScreenU - 0.025) / 0.95, (ScreenV - 0.025) / 0.95
+        Centered = np.maximum(np.abs(RemappedU - 0.5), np.abs(RemappedV - 0.5)) - 0.5
+        InsetFade = (0.01 - np.clip(Centered, 0.0, 0.01)) / 0.01
+        TextU, TextV = np.clip(RemappedU, 0.0, 1.0), np.clip(RemappedV, 0.0, 1.0)
+
+        # Backlighting from the screen and the faded border
+        Backlighting = np.maximum(0.0, 2.65 - np.hypot(ScreenU * 2.0 - 1.0, ScreenV * 2.0 - 1.0) / 0.5) / 2.65 * 0.5
+        ScreenBorder = 1.0 - np.maximum(0.0, np.maximum(np.abs(ScreenU - 0.5), np.abs(ScreenV - 0.5)) - 0.485) / 0.015
+        ScreenBorder = np.where(Outside, 0.0, ScreenBorder)
+
+        # Text is fully on or off, pixels outside it read a black pixel kept after the end of the screen
+        self.Pixels = np.zeros(Width * Height + 1, dtype=np.uint32)
+        self.TextIndex = np.where(InsetFade >= 1.0, self.LookupTable(TextU, TextV, Resolution), Width * Height)
+
+        # Bloom inside the screen and reflection outside it are sampled from one array with one weight
+        BloomCount = self.BloomSize[0] * self.BloomSize[1]
+        self.Glow = np.zeros(BloomCount + self.ReflectionSize[0] * self.ReflectionSize[1], dtype=np.uint32)
+        self.GlowIndex = np.where(Outside, BloomCount + self.LookupTable(U, V, self.ReflectionSize), self.LookupTable(TextU, TextV, self.BloomSize))
+        GlowWeight = np.round(np.where(Outside, EdgeFade, ScreenBorder * InsetFade) * 256.0).astype(np.uint16)
+        self.GlowWeight = np.repeat(GlowWeight[..., None], 4, axis=2)
+
+        # Byte order of the target so colours land in the right channels
+        self.Channels = [Shift // 8 for Shift in Target.get_shifts()[:3]]
+
+        # Vignette, backlight and ambient light never change, noise is baked into a few copies of them
+        Base = ScreenBorder[..., None] * Backlighting[..., None] * LightColorDark * 255.0 + np.where(Outside, EdgeFade, 0.0)[..., None] * 0.16 * 255.0
+        self.BaseFrames = [
+            self.Pack(Base + ((np.random.random((Height, Width)) - 0.5) * 0.1 * 255.0 * ScreenBorder)[..., None]).astype(np.uint16)
+            for Index in range(NoiseFrames)
+        ]
+
+        # Scan line brightness is looked up from the curved height of each pixel in steps of 1 / ScanSteps
+        self.ScanSteps = 256
+        self.ScanHeight = np.where(Outside, -self.ScanSteps, np.round(ScreenV * self.ScanSteps)).astype(np.int32)
+        self.RowTop = self.ScanHeight.max(axis=1)
+        self.RowBottom = np.where(Outside, 2 * self.ScanSteps, self.ScanHeight).min(axis=1)
+
+        # Each entry is a whole packed pixel so one add brightens all four channels, they never carry into each other
+        Distance = 1.0 - np.arange(self.ScanSteps // 4 + 1) / (self.ScanSteps // 4)
+        ScanColor = (LightColorDark + (LightColorDark.mean() - LightColorDark) * 0.5) * 0.075 * 255.0
+        self.ScanProfile = self.Pack(Distance[:, None] * ScanColor).astype(np.uint16).view(np.uint64)[:, 0]
+        self.ScanProfile[0] = 0
+
+        # Full size arrays keep numpy on its fast paths, broadcasting or scalars are several times slower here
+        self.Output = np.empty((Height, Width, 4), dtype=np.uint16)
+        self.Limit = np.full((Height, Width, 4), 255, dtype=np.uint16)
+        self.Frame = 0
+
+    def Pack(self, Colors):
+        # Spread RGB values over the four bytes of a pixel in the targets order
+        Packed = np.zeros(Colors.shape[:-1] + (4,))
+        Packed[..., self.Channels] = np.clip(Colors, 0.0, 255.0)
+        return Packed
+
+    @staticmethod
+    def LookupTable(U, V, Size):
+        X = np.clip((U * Size[0]).astype(np.intp), 0, Size[0] - 1)
+        Y = np.clip(((1.0 - V) * Size[1]).astype(np.intp), 0, Size[1] - 1)
+        return Y * Size[0] + X
+
+    @staticmethod
+    def BoxBlur(Image, Radius):
+        # Running sums make the blur cost the same for any radius
+        for Axis in (0, 1):
+            Padded = np.concatenate([np.repeat(Image.take([0], Axis), Radius + 1, Axis), Image, np.repeat(Image.take([-1], Axis), Radius, Axis)], Axis)
+            Summed = np.cumsum(Padded, axis=Axis)
+            Image = (Summed.take(range(2 * Radius + 1, Summed.shape[Axis]), Axis) - Summed.take(range(Summed.shape[Axis] - 2 * Radius - 1), Axis)) / (2 * Radius + 1)
+
+        return Image
+
+    @staticmethod
+    def Flatten(Surface):
+        # Pixels of a surface as one row after another, without the row padding
+        Pixels = np.frombuffer(Surface.get_buffer(), dtype=np.uint32)
+        return Pixels.reshape(Surface.get_height(), Surface.get_pitch() // 4)[:, :Surface.get_width()]
+
+    def Render(self, Source, Target, Time):
+        Width, Height = self.Resolution
+        self.Pixels[:-1].reshape(Height, Width)[:] = self.Flatten(Source)
+
+        # Bloom and reflection come from small blurred copies of the screen
+        Small = pygame.transform.smoothscale(Source, self.BloomSize)
+        Tiny = pygame.transform.smoothscale(Small, self.ReflectionSize)
+        Bloom = self.BoxBlur(self.Flatten(Small).view(np.uint8).reshape(self.BloomSize[1], self.BloomSize[0], 4).astype(np.float32), 3)
+        Reflection = self.BoxBlur(self.Flatten(Tiny).view(np.uint8).reshape(self.ReflectionSize[1], self.ReflectionSize[0], 4).astype(np.float32), 2)
+
+        BloomCount = self.BloomSize[0] * self.BloomSize[1]
+        self.Glow.view(np.uint8)[:BloomCount * 4] = np.minimum(Bloom * BloomStrength, 255.0).ravel()
+        self.Glow.view(np.uint8)[BloomCount * 4:] = Reflection.ravel()
+
+        # Remap through the lookup tables then add everything up in 16 bits
+        Output = self.Output
+        Output[:] = self.Glow[self.GlowIndex].view(np.uint8).reshape(Output.shape)
+        Output *= self.GlowWeight
+        Output >>= 8
+        Output += self.Pixels[self.TextIndex].view(np.uint8).reshape(Output.shape)
+        Output += self.BaseFrames[self.Frame % len(self.BaseFrames)]
+
+        # Large scan line effect, only the rows it currently covers are touched
+        ScanPosition = int((1.0 - (Time / 5.0) % 2.0) * self.ScanSteps)
+        Rows = np.nonzero((self.RowTop > ScanPosition) & (self.RowBottom < ScanPosition + self.ScanSteps // 4))[0]
+
+        if len(Rows):
+            Band = slice(Rows[0], Rows[-1] + 1)
+            Steps = np.clip(self.ScanHeight[Band] - ScanPosition, 0, self.ScanSteps // 4)
+            Output.view(np.uint64)[Band, :, 0] += self.ScanProfile[Steps]
+
+        np.minimum(Output, self.Limit, out=Output)
+        pygame.surfarray.blit_array(Target, Output.astype(np.uint8).view(np.uint32)[..., 0].T)
+
+        self.Frame += 1
@@ -0,0 +1,40 @@
+import time, threading, pygame
+
+class StartupLoader:
+    def __init__(self, ReadyEvent=None):
+        # Posted when each component finishes loading, or fails to, so the main loop wakes for it
+        self.ReadyEvent = ReadyEvent
+
+        # Loaded components, errors of those that failed and how long each took, by name
+        self.Components = {}
+        self.Errors = {}
+        self.LoadTimes = {}
+        self.Pending = []
+
+    def Start(self, Name, Load):
+        # Every component loads on its own thread so they all load at once
+        self.Pending.append(Name)
+
+        Thread = threading.Thread(target=self.LoadTask, args=(Name, Load))
+        Thread.daemon = True
+        Thread.start()
+
+    def LoadTask(self, Name, Load):
+        StartTime = time.perf_counter()
+
+        try:
+            self.Components[Name] = Load()
+        except Exception as Error:
+            self.Errors[Name] = Error
+
+        self.LoadTimes[Name] = time.perf_counter() - StartTime
+        self.Pending.remove(Name)
+
+        if self.ReadyEvent is not None:
+            pygame.event.post(pygame.event.Event(self.ReadyEvent, Name=Name))
+
+    def Ready(self, *Names):
+        return all(Name in self.Components for Name in Names)
+
+    def Get(self, Name):
+        return self.Components.get(Name)
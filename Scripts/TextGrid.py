@@ -0,0 +1,117 @@
+import pygame
+import moderngl as mgl
+import numpy as np
+
+class TextGrid:
+    def __init__(self, Context, QuadBuffer, VertexShader, Atlas, GridSize, Resolution, Color, FadeColor, SettleFrames):
+        self.Context = Context
+        self.Atlas = Atlas
+        self.GridSize = GridSize
+        self.Resolution = Resolution
+
+        with open("Shaders/TextGrid.glsl") as File:
+            self.Program = Context.program(vertex_shader=VertexShader, fragment_shader=File.read())
+
+        # Texture coords are unused here since cells are found from the pixel position
+        self.RenderObject = Context.vertex_array(self.Program, [(QuadBuffer, "2f 2x4", "vert")])
+
+        self.Program["CellSize"] = tuple(Atlas.FontSize)
+        self.Program["GlyphSize"] = tuple(Atlas.CellSize)
+        self.Program["AtlasColumns"] = Atlas.Columns
+        self.Program["TextColor"] = tuple(Value / 255 for Value in Color)
+        self.Program["Decay"] = tuple(Value / 255 for Value in FadeColor)
+        self.Program["GridTexture"] = 1
+        self.Program["AtlasTexture"] = 2
+        self.Program["PreviousTexture"] = 3
+
+        # Character codes for every cell, a few kilobytes uploaded instead of a whole frame
+        self.Codes = np.zeros((GridSize[1], GridSize[0]), dtype=np.uint16)
+        self.GridTexture = Context.texture(GridSize, 1, dtype="u2")
+        self.GridTexture.filter = (mgl.NEAREST, mgl.NEAREST)
+
+        self.AtlasTexture, self.AtlasGlyphs = None, 0
+        self.Color = tuple(Color)
+
+        # Ping pong pair, each frame decays the other one and the result is sampled by the screen shader
+        self.Textures, self.Framebuffers = [], []
+
+        for Index in range(2):
+            Texture = Context.texture(Resolution, 4)
+            Texture.repeat_x, Texture.repeat_y = False, False
+            Framebuffer = Context.framebuffer(color_attachments=[Texture])
+            Framebuffer.clear(0.0, 0.0, 0.0, 1.0)
+
+            self.Textures.append(Texture)
+            self.Framebuffers.append(Framebuffer)
+
+        self.Current = 0
+
+        # Once nothing has changed for this long the fade has settled and rendering can stop
+        self.SettleFrames = SettleFrames
+        self.FramesLeft = SettleFrames
+
+        self.PreviousLines = []
+        self.UploadedBytes = 0
+
+    def UploadAtlas(self):
+        if self.AtlasTexture is not None:
+            self.AtlasTexture.release()
+
+        # Only the alpha is needed, the color is applied in the shader
+        Surface = self.Atlas.Surfaces[self.Color]
+        Alpha = np.ascontiguousarray(pygame.surfarray.array_alpha(Surface).T)
+
+        self.AtlasTexture = self.Context.texture(Surface.get_size(), 1, Alpha.tobytes(), alignment=1)
+        self.AtlasTexture.filter = (mgl.NEAREST, mgl.NEAREST)
+        self.AtlasGlyphs = len(self.Atlas.Rects)
+
+        self.UploadedBytes += Alpha.nbytes
+
+    def Update(self, Lines):
+        self.UploadedBytes = 0
+        Changed = False
+
+        for Row in range(self.GridSize[1]):
+            Text = Lines[Row] if Row < len(Lines) else ""
+
+            if Row < len(self.PreviousLines) and self.PreviousLines[Row] == Text:
+                continue
+
+            Text = Text[:self.GridSize[0]]
+            self.Codes[Row] = 0
+            self.Codes[Row, :len(Text)] = [0 if Letter == " " else self.Atlas.GetIndex(Letter) + 1 for Letter in Text]
+            Changed = True
+
+        self.PreviousLines = [Lines[Row] if Row < len(Lines) else "" for Row in range(self.GridSize[1])]
+
+        # New characters may have been added to the atlas while encoding
+        if self.AtlasGlyphs != len(self.Atlas.Rects):
+            self.UploadAtlas()
+
+        if Changed:
+            self.GridTexture.write(self.Codes.tobytes())
+            self.UploadedBytes += self.Codes.nbytes
+            self.FramesLeft = self.SettleFrames
+
+        return Changed
+
+    def Render(self):
+        if self.FramesLeft <= 0:
+            return False
+
+        Previous, self.Current = self.Current, 1 - self.Current
+
+        self.Framebuffers[self.Current].use()
+        self.GridTexture.use(1)
+        self.AtlasTexture.use(2)
+        self.Textures[Previous].use(3)
+        self.RenderObject.render(mode=mgl.TRIANGLE_STRIP)
+        self.FramesLeft -= 1
+
+        return True
+
+    def IsIdle(self):
+        return self.FramesLeft <= 0
+
+    def Use(self, Location=0):
+        self.Textures[self.Current].use(Location)
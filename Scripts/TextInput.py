@@ -1,34 +1,71 @@
-import time, pygame
+import time, re, pygame
+
+from .GapBuffer import GapBuffer
 
 class TextInput:
-    def __init__(self):
-        self.Text = ""
+    def __init__(self, PasteChunk=2048):
+        self.Buffer = GapBuffer()
         self.Offset = 0
-        self.InsertionPoint = len(self.Text)
+        self.InsertionPoint = len(self.Buffer)
         self.CharLength = 42
 
+        # Large pastes are inserted a chunk per frame so they never stall rendering,
+        # an offset tracks progress so the rest of the paste is never copied
+        self.Paste = ""
+        self.PasteOffset = 0
+        self.PasteChunk = PasteChunk
+
+    @property
+    def PendingPaste(self):
+        # Characters of the paste still to be inserted
+        return len(self.Paste) - self.PasteOffset
+
+    @property
+    def Text(self):
+        return str(self.Buffer)
+
+    @Text.setter
+    def Text(self, Value):
+        self.Buffer.Clear()
+        self.Buffer.Insert(0, Value)
+        self.InsertionPoint = min(self.InsertionPoint, len(self.Buffer))
+        self.Paste, self.PasteOffset = "", 0
+
     def GetInputText(self):
-        InputText = self.Text[self.Offset:min(len(self.Text), self.Offset + self.CharLength)]
-        
+        # Only the visible window is copied out of the buffer
+        InputText = self.Buffer.Slice(self.Offset, self.Offset + self.CharLength)
+
         if time.time() % 1 > 0.5:
             ScaledInsertionPoint = self.InsertionPoint - self.Offset
             return f"{InputText[:ScaledInsertionPoint]}█{InputText[ScaledInsertionPoint + 1:]}"
         else:
             return InputText
 
+    def InsertText(self, Text):
+        # Add text at the insertion point
+        self.Buffer.Insert(self.InsertionPoint, Text)
+        self.InsertionPoint += len(Text)
+
+        # If going outside of text box increase offset to keep it in
+        if self.InsertionPoint - self.Offset > self.CharLength:
+            self.Offset = self.InsertionPoint - self.CharLength
+
+    def Update(self):
+        # Insert the next chunk of any paste still in progress
+        if self.PendingPaste:
+            self.InsertText(self.Paste[self.PasteOffset:self.PasteOffset + self.PasteChunk])
+            self.PasteOffset += self.PasteChunk
+
+            if self.PasteOffset >= len(self.Paste):
+                self.Paste, self.PasteOffset = "", 0
+
     def Event(self, Event, CanProcess):
 
         if Event.type == pygame.TEXTINPUT:
 
             # Add key to text
-            self.Text = self.Text[:self.InsertionPoint] + Event.text + self.Text[self.InsertionPoint:]
-            self.InsertionPoint = min(len(self.Text), self.InsertionPoint + 1)
-            self.SelectionPoint = self.InsertionPoint
-
-            # If going outside of text box increase offset to keep it in
-            if len(self.Text) - self.Offset > self.CharLength:
-                self.Offset += 1
-                    
+            self.InsertText(Event.text)
+
         elif Event.type == pygame.KEYDOWN:
 
             # If backspace remove char at end of string
@@ -36,17 +73,17 @@ class TextInput:
 
                 if self.InsertionPoint == 0:
                     return False
-                
+
                 # Remove one letter
-                self.Text = self.Text[:max(0, self.InsertionPoint - 1)] + self.Text[self.InsertionPoint:]
+                self.Buffer.Delete(self.InsertionPoint)
                 self.InsertionPoint = max(0, self.InsertionPoint - 1)
 
                 # If going outside of text box decrease offset to keep it in
                 if self.Offset > self.InsertionPoint:
                     self.Offset = max(0, self.InsertionPoint)
 
-            # If enter set value
-            elif Event.key == pygame.K_RETURN and self.Text != "" and CanProcess:
+            # If enter set value, waiting for any paste to finish first
+            elif Event.key == pygame.K_RETURN and len(self.Buffer) and not self.PendingPaste and CanProcess:
                 self.Offset, self.InsertionPoint = 0, 0
                 return True
 
@@ -59,7 +96,7 @@ class TextInput:
 
             # If right arrow move insertion point
             elif Event.key == pygame.K_RIGHT:
-                self.InsertionPoint = min(len(self.Text), self.InsertionPoint + 1)
+                self.InsertionPoint = min(len(self.Buffer), self.InsertionPoint + 1)
 
                 if self.InsertionPoint > self.Offset + self.CharLength:
                     self.Offset = self.InsertionPoint - self.CharLength
@@ -72,18 +109,12 @@ class TextInput:
                     # Get raw bytes
                     PastedBytes = pygame.scrap.get(pygame.SCRAP_TEXT)
 
-                    # If returned data and it isnt to long add to text
-                    if PastedBytes and len(PastedBytes) < 50:
+                    if PastedBytes:
 
-                        # Decode into string
-                        PastedText = PastedBytes.decode("utf-8").strip().strip("\x00")
-                        
-                        # Add key to text
-                        self.Text = self.Text[:self.InsertionPoint] + PastedText + self.Text[self.InsertionPoint:]
-                        self.InsertionPoint = min(len(self.Text), self.InsertionPoint + len(PastedText))
+                        # Decode into a single line string, any length is accepted
+                        PastedText = PastedBytes.decode("utf-8", "ignore").replace("\x00", "")
+                        PastedText = re.sub(r"[\r\n\t]+", " ", PastedText).strip()
 
-                        # If going outside of text box increase offset to keep it in
-                        if len(self.Text) - self.Offset > self.CharLength:
-                            self.Offset += len(self.Text) - self.Offset - self.CharLength
+                        self.Paste, self.PasteOffset = self.Paste[self.PasteOffset:] + PastedText, 0
 
         return False
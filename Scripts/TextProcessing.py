@@ -1,9 +1,20 @@
 import random, time
 
+from .Scrollback import Scrollback
+from .WordWrap import WrapEngine
+
 class TextProcessing:
-    def __init__(self):
-        self.ConversationLines = []
-        self.Offset = 0
+    def __init__(self, MemoryLines=2000, SpillPath="", Journal=None):
+        # Bounded in memory, older lines are spilled to disk and padded only when drawn
+        ResumePath = Journal.LinesPath if Journal is not None and Journal.Resumed else ""
+        self.ConversationLines = Scrollback(46, MemoryLines, SpillPath, ResumePath)
+        self.Wrapper = WrapEngine(self.ConversationLines, 46)
+
+        # Lines are journaled once they are final, a streaming reply only once it is closed
+        self.Journal = Journal
+        self.Journaled = len(self.ConversationLines)
+
+        self.Offset = max(0, len(self.ConversationLines) - 41)
 
         self.SystemLines = [
             "Error 42: Cake location undisclosed           ",
@@ -72,45 +83,40 @@ class TextProcessing:
         ]
 
     def AddConversatoinText(self, InputText, Gap):
-        NewLines = [" " * 46] if Gap else []
+        self.Wrapper.Add(InputText, Gap)
+        self.Offset = max(self.Offset, len(self.ConversationLines) - 41)
+        self.JournalLines()
 
-        while InputText:
-            
-            # Find the max length substring within 46 characters
-            if len(InputText) <= 46:
-                Chunk = InputText
-                InputText = ""
-                
-            else:
-                # Check for the last space within the first 46 characters
-                SplitPosition = InputText[:46].rfind(" ")
-                
-                if SplitPosition == -1:
-                    # If no space is found, split at 46
-                    Chunk = InputText[:46]
-                    InputText = InputText[46:]
-                    
-                else:
-                    # Split at the last space within 46 characters
-                    Chunk = InputText[:SplitPosition]
-                    InputText = InputText[SplitPosition + 1:]
-            
-            # Pad the chunk with spaces to make it exactly 50 characters
-            NewLines.append(Chunk.ljust(46))
+    def OpenConversationText(self, InputText, Gap):
+        # Start a paragraph that can keep growing as fragments arrive
+        self.Wrapper.Open(InputText, Gap)
+        self.Offset = max(self.Offset, len(self.ConversationLines) - 41)
 
-        self.ConversationLines += NewLines
+    def AppendConversationText(self, Fragment):
+        self.Wrapper.Append(Fragment)
         self.Offset = max(self.Offset, len(self.ConversationLines) - 41)
 
+    def CloseConversationText(self):
+        self.Wrapper.Close()
+        self.JournalLines()
+
+    def JournalLines(self):
+        if self.Journal is not None:
+            self.Journal.AddLines([self.ConversationLines[Index] for Index in range(self.Journaled, len(self.ConversationLines))])
+            self.Journaled = len(self.ConversationLines)
+
     def Scroll(self, Amount):
         self.Offset = max(min(self.Offset + Amount, len(self.ConversationLines) - 1), 0)
 
     def GetLoadingText(self):
         return [""] * 13 + [" " * 26 + Line for Line in self.Logo]
 
-    def GetMainText(self, UserInput):
+    def GetMainText(self, UserInput, Overlay=[], Status=""):
         
-        GetConversationLine = lambda LineNumber: self.ConversationLines[LineNumber + self.Offset] if len(self.ConversationLines) - self.Offset > LineNumber else ' ' * 46
-        GetSystemLine = lambda LineNumber: self.SystemLines[(int(time.time() * 0.5) + LineNumber) % len(self.SystemLines)]
+        GetConversationLine = lambda LineNumber: self.ConversationLines[LineNumber + self.Offset].ljust(46) if len(self.ConversationLines) - self.Offset > LineNumber else ' ' * 46
+
+        # Overlay lines take the place of the top system lines
+        GetSystemLine = lambda LineNumber: Overlay[LineNumber] if LineNumber < len(Overlay) else self.SystemLines[(int(time.time() * 0.5) + LineNumber) % len(self.SystemLines)]
 
         LinesArray = []
         
@@ -123,7 +129,7 @@ class TextProcessing:
 
             # Left side
             if Index < 41: FinalLine += f"   {GetConversationLine(Index)}   " if Index % 2 == 0 else f"|  {GetConversationLine(Index)}  |"
-            elif Index == 41: FinalLine += f"|{' ' * 50}|"
+            elif Index == 41: FinalLine += f"|  {Status[:46].ljust(46)}  |"
             elif Index == 42: FinalLine += f"   >>> {UserInput}{' ' * (43 - len(UserInput))}   "
 
             # Right side
@@ -1,4 +1,4 @@
-import os, json, torch, warnings, threading, re, gdown
+import os, json, torch, warnings, threading, re, gdown, time
 import numpy as np
 import sounddevice as sd
 
@@ -56,43 +56,80 @@ def GetTactron2(ModelName, ModelID):
     return Model, HyperParams
 
 class TextToSpeech:
-    def __init__(self, HifiganName, Tacotron2Name, HifiganID, Tacotron2ID, StopThreshold=0.9):
+    def __init__(self, HifiganName, Tacotron2Name, HifiganID, Tacotron2ID, StopThreshold=0.9, OnAudio=None):
         self.HifiganModel, self.HifiganHyperParams = GetHifigan(HifiganName, HifiganID)
         self.Tacotron2Model, self.Tacotron2HyperParams = GetTactron2(Tacotron2Name, Tacotron2ID)
 
         self.Tacotron2Model.decoder.max_decoder_steps = 1000
         self.Tacotron2Model.decoder.gate_threshold = StopThreshold
 
+        # Called from the inference thread with the text, all of its audio and the seconds spent synthesizing it
+        self.OnAudio = OnAudio
+
         self.InferenceThread = None
         self.IsProcessing = False
 
-    def StartInference(self, Text):
+    def StartInference(self, Text, Audio=None):
+        # Audio made earlier for the same text is played as it is
         if not self.IsProcessing:
             self.IsProcessing = True
-            self.InferenceThread = threading.Thread(target=self.InferenceTask, args=(Text,))
+
+            if Audio is None:
+                self.InferenceThread = threading.Thread(target=self.InferenceTask, args=(Text,))
+            else:
+                self.InferenceThread = threading.Thread(target=self.PlayTask, args=(Audio,))
+
             self.InferenceThread.daemon = True
             self.InferenceThread.start()
 
+    def PlayTask(self, Audio):
+        try:
+            sd.play(Audio, samplerate=self.Tacotron2HyperParams.sampling_rate, blocking=True)
+        finally:
+            self.IsProcessing = False
+
+    @staticmethod
+    def Sentences(Text):
+        # Each sentence is spoken on its own, cleaned of anything the models cannot say
+        Sentences = []
+
+        for Sentence in re.split(r'[.!?]', Text):
+            CleanedSentence = re.sub(r'[^\w\s]', '', Sentence)
+
+            if CleanedSentence:
+
+                if CleanedSentence[-1] != ";":
+                    CleanedSentence = CleanedSentence + ";"
+
+                Sentences.append(CleanedSentence)
+
+        return Sentences
+
+    def Synthesize(self, CleanedSentence):
+        with torch.no_grad():
+
+            TextSequence = np.array(text_to_sequence(CleanedSentence, ["english_cleaners"]))[None, :]
+            TextSequence = torch.autograd.Variable(torch.from_numpy(TextSequence)).to(Device).long()
+
+            MelSpectrogram, MelSpectrogramPostnet, GateOutputs, AttentionAlignments = self.Tacotron2Model.inference(TextSequence)
+            GeneratedAudio = self.HifiganModel(MelSpectrogramPostnet.float())
+
+            FinalAudio = GeneratedAudio.squeeze() * MAX_WAV_VALUE
+            return FinalAudio.cpu().numpy().astype("int16")
+
     def InferenceTask(self, Text):
+        Sentences, SynthesisTime = [], 0.0
+
         try:
-            for Sentence in re.split(r'[.!?]', Text):
-                CleanedSentence = re.sub(r'[^\w\s]', '', Sentence)
-                    
-                if CleanedSentence:
-                    
-                    if CleanedSentence[-1] != ";":
-                        CleanedSentence = CleanedSentence + ";"
-                        
-                    with torch.no_grad():
-                        
-                        TextSequence = np.array(text_to_sequence(CleanedSentence, ["english_cleaners"]))[None, :]
-                        TextSequence = torch.autograd.Variable(torch.from_numpy(TextSequence)).to(Device).long()
-
-                        MelSpectrogram, MelSpectrogramPostnet, GateOutputs, AttentionAlignments = self.Tacotron2Model.inference(TextSequence)
-                        GeneratedAudio = self.HifiganModel(MelSpectrogramPostnet.float())
-                        
-                        FinalAudio = GeneratedAudio.squeeze() * MAX_WAV_VALUE
-                        sd.play(FinalAudio.cpu().numpy().astype("int16"), samplerate=self.Tacotron2HyperParams.sampling_rate, blocking=True)
+            for CleanedSentence in self.Sentences(Text):
+                StartTime = time.perf_counter()
+                Sentences.append(self.Synthesize(CleanedSentence))
+                SynthesisTime += time.perf_counter() - StartTime
+
+                sd.play(Sentences[-1], samplerate=self.Tacotron2HyperParams.sampling_rate, blocking=True)
+
+            if self.OnAudio is not None and Sentences:
+                self.OnAudio(Text, np.concatenate(Sentences), SynthesisTime)
 
         finally:
             self.IsProcessing = False
@@ -0,0 +1,62 @@
+def WrapTail(Text, Width):
+    # Walks the text by index so a long paste never copies its remainder once per line
+    Lines, Start = [], 0
+
+    while len(Text) - Start > Width:
+        # Check for the last space within the next width characters
+        SplitPosition = Text.rfind(" ", Start, Start + Width)
+
+        if SplitPosition == -1:
+            # If no space is found, split at the width
+            Lines.append(Text[Start:Start + Width])
+            Start += Width
+
+        else:
+            # Split at the last space within the width
+            Lines.append(Text[Start:SplitPosition])
+            Start = SplitPosition + 1
+
+    # Every line but the remainder is final, more text can only ever change the remainder
+    return Lines, Text[Start:]
+
+def WrapText(Text, Width):
+    Lines, Remainder = WrapTail(Text, Width)
+    return Lines + [Remainder] if Remainder else Lines
+
+class WrapEngine:
+    def __init__(self, Lines, Width=46):
+        self.Lines = Lines
+        self.Width = Width
+
+        # Unwrapped text of the open paragraphs last line, None when no paragraph is open
+        self.Tail = None
+
+    def Add(self, Text, Gap):
+        self.Close()
+
+        if Gap:
+            self.Lines.Append("")
+
+        for Line in WrapText(Text, self.Width):
+            self.Lines.Append(Line)
+
+    def Open(self, Text, Gap):
+        self.Add("", Gap)
+        self.Tail = ""
+        self.Append(Text)
+
+    def Append(self, Fragment):
+        if self.Tail is None:
+            return self.Add(Fragment, False)
+
+        # Only the tail line is re-wrapped, everything before it is already final
+        if self.Tail:
+            self.Lines.Pop()
+
+        Lines, self.Tail = WrapTail(self.Tail + Fragment, self.Width)
+
+        for Line in Lines + ([self.Tail] if self.Tail else []):
+            self.Lines.Append(Line)
+
+    def Close(self):
+        self.Tail = None
@@ -0,0 +1,57 @@
+# Loads the language model client and the voice once and serves them to any number of GLaDOS-Terminal windows
+# started with "Mode": "client" under "Server" in Settings.json
+
+import json, time, argparse, threading
+
+from Scripts.LargeLanguageModel import LargeLanguageModel
+from Scripts.TextToSpeech import TextToSpeech
+from Scripts.ModelServer import ModelServer
+
+with open("Settings.json", "r") as File:
+    Settings = json.loads(File.read())
+
+Parser = argparse.ArgumentParser(description="Share one language model and voice between several terminals.")
+Parser.add_argument("--host", default=Settings["Server"]["Host"])
+Parser.add_argument("--port", type=int, default=Settings["Server"]["Port"])
+Parser.add_argument("--slots", type=int, default=1, help="replies generated at once, match OLLAMA_NUM_PARALLEL")
+Parser.add_argument("--stats-interval", type=float, default=60, help="seconds between per client stats, 0 for none")
+Arguments = Parser.parse_args()
+
+StartTime = time.perf_counter()
+
+# Each client brings its own history, so this one is never used for requests
+LLM = LargeLanguageModel(
+    Settings["ModelName"], Settings["SystemPrompt"], None, None, Settings["ResponseTimeout"],
+    Settings["History"]["TokenBudget"], Settings["History"]["KeepTurns"],
+    Settings["KeepAlive"], Settings["KeepWarmInterval"], Settings["OllamaHost"] or None
+)
+
+TTS = TextToSpeech(
+    Settings["VoiceModels"]["ModelNameHifigan"], Settings["VoiceModels"]["ModelNameTacotron2"],
+    Settings["VoiceModels"]["ModelIDHifigan"], Settings["VoiceModels"]["ModelIDTacotron2"], 0.75
+)
+
+Server = ModelServer(
+    LLM, TTS, Settings["SystemPrompt"], Settings["History"]["TokenBudget"], Settings["History"]["KeepTurns"],
+    Arguments.host, Arguments.port, Arguments.slots
+)
+
+print(f"Loaded in {time.perf_counter() - StartTime:.2f} s, serving on {Arguments.host}:{Arguments.port}")
+
+def StatsTask():
+    while True:
+        time.sleep(Arguments.stats_interval)
+
+        for Name, Summary in Server.Summary().items():
+            print(f"{Name}: {Server.FormatSummary(Summary)}")
+
+if Arguments.stats_interval > 0:
+    threading.Thread(target=StatsTask, daemon=True).start()
+
+try:
+    Server.Thread.join()
+except KeyboardInterrupt:
+    pass
+finally:
+    Server.Close()
+    LLM.Close()
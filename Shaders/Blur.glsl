@@ -0,0 +1,23 @@
+#version 330 core
+
+uniform sampler2D Source;
+uniform vec2 Direction;
+
+// Base shader variables
+in vec2 FragCoord;
+out vec4 FragColor;
+
+// Gaussian weights for the center tap and four taps on each side
+const float Weights[5] = float[](0.227027, 0.1945946, 0.1216216, 0.054054, 0.016216);
+
+void main()
+{
+    // One direction at a time, run once horizontally and once vertically
+    FragColor = texture(Source, FragCoord) * Weights[0];
+
+    for (int i = 1; i < 5; i++)
+    {
+        FragColor += texture(Source, FragCoord + Direction * float(i)) * Weights[i];
+        FragColor += texture(Source, FragCoord - Direction * float(i)) * Weights[i];
+    }
+}
@@ -0,0 +1,17 @@
+#version 330 core
+
+uniform sampler2D Source;
+uniform vec2 TexelSize;
+
+// Base shader variables
+in vec2 FragCoord;
+out vec4 FragColor;
+
+void main()
+{
+    // Four bilinear taps average a 4x4 block of source texels
+    FragColor = (texture(Source, FragCoord + TexelSize * vec2(-1.0, -1.0)) +
+                 texture(Source, FragCoord + TexelSize * vec2( 1.0, -1.0)) +
+                 texture(Source, FragCoord + TexelSize * vec2(-1.0,  1.0)) +
+                 texture(Source, FragCoord + TexelSize * vec2( 1.0,  1.0))) * 0.25;
+}
@@ -1,6 +1,8 @@
 #version 330 core
 
 uniform sampler2D PygameTexture;
+uniform sampler2D BloomTexture;
+uniform sampler2D ReflectionTexture;
 uniform float Time;
 
 // Base shader variables
@@ -11,8 +13,7 @@ out vec4 FragColor;
 const vec4 LightColorDark = vec4(0.52, 0.36, 0.2, 0.0);
 
 const float Curvature = 0.3;
-const float ReflectionBlurItterations = 10.0;
-const float ReflectionBlurSize = 0.25;
+const float BloomStrength = 1.05;
 
 float Random(vec2 Seed)
 {
@@ -68,12 +69,8 @@ void main()
         // Set ambient color
         FragColor += vec4(0.8, 0.8, 0.8, 0.0) * 0.2;
         
-        // Light reflection
-	    for(float i = 0.0; i < ReflectionBlurItterations; i++)
-	    {
-	    	vec2 ReflectionUV = FragCoord + (vec2(Random(FragCoord.xy + i), Random(FragCoord.yx + i)) - 0.5) * ReflectionBlurSize;
-	    	FragColor += texture(PygameTexture, clamp(ReflectionUV, 0.0, 1.0)) / ReflectionBlurItterations;
-	    }
+        // Light reflection from the pre blurred low resolution copy of the screen
+        FragColor += texture(ReflectionTexture, clamp(FragCoord, 0.0, 1.0));
         
         FragColor *= -ScreenUV.x;
     }
@@ -86,9 +83,9 @@ void main()
         // Noise in background
         float Noise = 0.1 * (Random(ScreenUV) - 0.5);
 
-        // Large scane line effect
-        float ScanPosition = 1.0 - mod(Time / 5.0, 2.0);
-        float DistToScan = 1.0 - (ScreenUV.y - ScanPosition) * 4.0;
+        // Large scane line effect, coords start at the top so it moves down the screen
+        float ScanPosition = mod(Time / 5.0, 2.0);
+        float DistToScan = 1.0 - (ScanPosition - ScreenUV.y) * 4.0;
         vec4 ScreenScan = (DistToScan > 0.0 && DistToScan < 1.0) ? CompressColor(LightColorDark, 0.5) * 0.075 * DistToScan : vec4(0.0);
 
         // Backlighting from screen
@@ -109,10 +106,8 @@ void main()
         // The text itself
         FragColor += texture(PygameTexture, TextSampleUV.xy) * (TextSampleUV.z < 1.0 ? 0.0 : 1.0);
         
-        // Bloom using composed MipMaps
-	    FragColor += (textureLod(PygameTexture, TextSampleUV.xy, 3.0) +
-                      textureLod(PygameTexture, TextSampleUV.xy, 4.0) +
-                      textureLod(PygameTexture, TextSampleUV.xy, 5.0)) * TextSampleUV.z * 0.35;
+        // Bloom from the pre blurred quarter resolution copy of the screen
+        FragColor += texture(BloomTexture, TextSampleUV.xy) * TextSampleUV.z * BloomStrength;
                         
         FragColor *= ScreenBorder;
     }
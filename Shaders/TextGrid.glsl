@@ -0,0 +1,52 @@
+#version 330 core
+
+uniform usampler2D GridTexture;
+uniform sampler2D AtlasTexture;
+uniform sampler2D PreviousTexture;
+
+uniform ivec2 CellSize;
+uniform ivec2 GlyphSize;
+uniform int AtlasColumns;
+uniform vec3 TextColor;
+uniform vec3 Decay;
+
+out vec4 FragColor;
+
+float GlyphCoverage(ivec2 Cell, ivec2 Local)
+{
+    if (Cell.x < 0 || Local.x >= GlyphSize.x || Local.y >= GlyphSize.y)
+        return 0.0;
+
+    // Zero is an empty cell, everything else is an atlas index plus one
+    uint Code = texelFetch(GridTexture, Cell, 0).r;
+
+    if (Code == 0u)
+        return 0.0;
+
+    int Index = int(Code) - 1;
+    ivec2 Origin = ivec2(Index % AtlasColumns, Index / AtlasColumns) * GlyphSize;
+
+    return texelFetch(AtlasTexture, Origin + Local, 0).r;
+}
+
+void main()
+{
+    // Rows are stored top first like pygame so the pixel position needs no flipping
+    ivec2 Pixel = ivec2(gl_FragCoord.xy);
+    ivec2 Cell = Pixel / CellSize;
+    ivec2 Local = Pixel - Cell * CellSize;
+
+    // Glyphs are wider than a cell so blend in the neighbours overhanging from the left, in draw order
+    float Coverage = 0.0;
+
+    for (int Step = (GlyphSize.x - 1) / CellSize.x; Step >= 0; Step--)
+    {
+        float Alpha = GlyphCoverage(Cell - ivec2(Step, 0), Local + ivec2(Step * CellSize.x, 0));
+        Coverage = Coverage * (1.0 - Alpha) + Alpha;
+    }
+
+    // Phosphor persistence, decay the previous frame then draw the new glyphs over it
+    vec3 Previous = max(texelFetch(PreviousTexture, ivec2(gl_FragCoord.xy), 0).rgb - Decay, 0.0);
+
+    FragColor = vec4(mix(Previous, TextColor, Coverage), 1.0);
+}
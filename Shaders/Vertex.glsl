@@ -3,10 +3,13 @@
 in vec2 vert;
 in vec2 texcoord;
 
+// Textures hold rows top first like pygame, only the pass drawn to the window needs turning upside down
+uniform bool FlipY;
+
 out vec2 FragCoord;
 
 void main()
 {
-    FragCoord = texcoord;
+    FragCoord = FlipY ? vec2(texcoord.x, 1.0 - texcoord.y) : texcoord;
     gl_Position = vec4(vert, 0.0, 1.0);
 }